@@ -0,0 +1,60 @@
+"""Benchmarks for sphinx-timeline.
+
+Run with ``tox -e bench``, which writes the results to ``.benchmarks/results.json``,
+or directly with e.g.::
+
+    pytest benchmarks --benchmark-json=results.json
+    pytest benchmarks --benchmark-compare=0001 --benchmark-autosave
+
+to compare against a previously saved run.
+"""
+import csv
+import json
+from pathlib import Path
+
+import pytest
+import yaml
+
+
+def make_events(num_events: int) -> list[dict]:
+    """Create synthetic events, with some durations and time zones."""
+    return [
+        {
+            "start": f"20{idx % 30 + 10}-{idx % 12 + 1:02d}-{idx % 28 + 1:02d}"
+            f" {idx % 24:02d}:{idx % 60:02d}"
+            + (" (Europe/Zurich)" if idx % 3 == 0 else ""),
+            "name": f"Event {idx}",
+            **({"duration": f"{idx % 5 + 1} days"} if idx % 2 == 0 else {}),
+        }
+        for idx in range(num_events)
+    ]
+
+
+def write_events(path: Path, fmt: str, events: list[dict]) -> Path:
+    """Write events to a file, in the given format."""
+    with path.open("w", encoding="utf8", newline="") as handle:
+        if fmt == "yaml":
+            yaml.safe_dump(events, handle)
+        elif fmt == "json":
+            json.dump(events, handle)
+        elif fmt == "jsonl":
+            handle.writelines(json.dumps(event) + "\n" for event in events)
+        elif fmt == "csv":
+            writer = csv.DictWriter(handle, fieldnames=["start", "name", "duration"])
+            writer.writeheader()
+            writer.writerows(events)
+    return path
+
+
+@pytest.fixture(scope="session")
+def events_file(tmp_path_factory):
+    """Return a factory for (cached) synthetic events files."""
+    files = {}
+
+    def _factory(fmt: str, num_events: int) -> Path:
+        if (fmt, num_events) not in files:
+            path = tmp_path_factory.mktemp("events") / f"events.{fmt}"
+            files[(fmt, num_events)] = write_events(path, fmt, make_events(num_events))
+        return files[(fmt, num_events)]
+
+    return _factory
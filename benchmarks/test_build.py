@@ -0,0 +1,49 @@
+"""End-to-end benchmarks of building a synthetic multi-page site."""
+import shutil
+
+import pytest
+from sphinx.cmd.build import build_main
+
+from .conftest import make_events, write_events
+
+
+@pytest.fixture
+def site(tmp_path):
+    """Create a site, with pages sharing an events file."""
+    srcdir = tmp_path / "src"
+    srcdir.mkdir()
+    srcdir.joinpath("conf.py").write_text("extensions = ['sphinx_timeline']\n")
+    write_events(srcdir / "events.yaml", "yaml", make_events(1000))
+    pages = [f"page{idx}" for idx in range(20)]
+    srcdir.joinpath("index.rst").write_text(
+        "Site\n====\n\n.. toctree::\n\n" + "".join(f"   {p}\n" for p in pages)
+    )
+    for idx, page in enumerate(pages):
+        srcdir.joinpath(f"{page}.rst").write_text(
+            f"Page {idx}\n=======\n\n.. timeline::\n   :events: events.yaml\n"
+            f"   :max-items: {(idx + 1) * 10}\n\n   **{{{{dt}}}}** {{{{e.name}}}}\n"
+        )
+    return tmp_path
+
+
+def _build(site, *args):
+    assert (
+        build_main(["-q", "-b", "html", *args, str(site / "src"), str(site / "out")])
+        == 0
+    )
+
+
+@pytest.mark.parametrize("jobs", ["1", "auto"])
+def test_build_site(benchmark, site, jobs):
+    """Benchmark a clean build of the site."""
+
+    def _setup():
+        shutil.rmtree(site / "out", ignore_errors=True)
+
+    benchmark.pedantic(_build, (site, "-j", jobs), setup=_setup, rounds=3)
+
+
+def test_rebuild_site(benchmark, site):
+    """Benchmark an incremental rebuild of the site, with no changes."""
+    _build(site)
+    benchmark.pedantic(_build, (site,), rounds=3)
@@ -0,0 +1,67 @@
+"""Benchmarks for the full timeline directive."""
+import pytest
+from sphinx_pytest.plugin import CreateDoctree
+
+from sphinx_timeline.main import TimelineDirective
+
+
+@pytest.mark.parametrize("num_items", [10, 100, 1000, 10000])
+def test_directive_run(
+    benchmark, sphinx_doctree: CreateDoctree, events_file, monkeypatch, num_items
+):
+    """Benchmark ``TimelineDirective.run``, for an events file."""
+    sphinx_doctree.set_conf({"extensions": ["sphinx_timeline"]})
+    sphinx_doctree.srcdir.joinpath("events.json").write_bytes(
+        events_file("json", num_items).read_bytes()
+    )
+    content = (
+        ".. timeline::\n   :events: events.json\n   :events-format: json\n\n"
+        "   **{{dtrange}}**\n\n   {{e.name}} ({{duration}})\n"
+    )
+    # only time the directive, rather than the whole doctree creation
+    directive_run = TimelineDirective.run
+    results = []
+
+    def _run(directive):
+        result = benchmark.pedantic(directive_run, (directive,), rounds=1)
+        results.append(result)
+        return result
+
+    monkeypatch.setattr(TimelineDirective, "run", _run)
+    sphinx_doctree(content)
+    assert len(results) == 1
+
+
+@pytest.mark.parametrize("cache_size", [0, 10000])
+def test_directive_edit_rebuild(benchmark, tmp_path, monkeypatch, cache_size):
+    """Benchmark ``TimelineDirective.run``, when re-building after editing one event."""
+    from sphinx.cmd.build import build_main
+
+    from .conftest import make_events, write_events
+
+    srcdir = tmp_path / "src"
+    srcdir.mkdir()
+    srcdir.joinpath("conf.py").write_text("extensions = ['sphinx_timeline']\n")
+    events = make_events(5000)
+    write_events(srcdir / "events.yaml", "yaml", events)
+    srcdir.joinpath("index.rst").write_text(
+        "Site\n====\n\n.. timeline::\n   :events: events.yaml\n\n"
+        "   **{{dtrange}}**\n\n   *{{e.name}}*\n"
+    )
+    args = ["-q", "-b", "html", "-D", f"timeline_item_cache_size={cache_size}"]
+    args += [str(srcdir), str(tmp_path / "out")]
+    assert build_main(args) == 0
+    events[0]["name"] = "edited"
+    write_events(srcdir / "events.yaml", "yaml", events)
+
+    directive_run = TimelineDirective.run
+    results = []
+
+    def _run(directive):
+        result = benchmark.pedantic(directive_run, (directive,), rounds=1)
+        results.append(result)
+        return result
+
+    monkeypatch.setattr(TimelineDirective, "run", _run)
+    assert build_main(args) == 0
+    assert len(results) == 1
@@ -0,0 +1,49 @@
+"""Micro-benchmarks for the per-event date/time conversion cost."""
+import random
+
+import pytest
+
+from sphinx_timeline import dtime
+
+NUM_EVENTS = 10000
+
+
+def _starts(num_unique: int) -> list:
+    rng = random.Random(0)
+    zones = ["", " (Europe/Zurich)", " (America/New_York)", " (Asia/Tokyo)"]
+    unique = [
+        f"20{rng.randint(10, 30)}-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}"
+        f" {rng.randint(10, 23)}:00{rng.choice(zones)}"
+        for _ in range(num_unique)
+    ]
+    return [unique[idx % num_unique] for idx in range(NUM_EVENTS)]
+
+
+@pytest.mark.parametrize("num_unique", [100, NUM_EVENTS])
+def test_to_datetime(benchmark, num_unique):
+    """Benchmark converting start strings one at a time."""
+    values = _starts(num_unique)
+    benchmark(lambda: [dtime.to_datetime(value) for value in values])
+
+
+@pytest.mark.parametrize("num_unique", [100, NUM_EVENTS])
+def test_to_datetimes(benchmark, num_unique):
+    """Benchmark converting start strings in bulk."""
+    values = _starts(num_unique)
+    benchmark(dtime.to_datetimes, values)
+
+
+def test_parse_duration(benchmark):
+    """Benchmark parsing duration strings."""
+    values = ["1 day", "2 hours 30 minutes", "1 year 2 months", "45min"] * (
+        NUM_EVENTS // 4
+    )
+    benchmark(lambda: [dtime.parse_duration(value) for value in values])
+
+
+def test_fmt_daterange(benchmark):
+    """Benchmark formatting date ranges."""
+    starts = dtime.to_datetimes(_starts(100))
+    durations = [dtime.parse_duration(value) for value in ("", "1 day", "2 hours")]
+    values = [(start, durations[idx % 3]) for idx, start in enumerate(starts)]
+    benchmark(lambda: [dtime.fmt_daterange(*value) for value in values])
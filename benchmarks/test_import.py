@@ -0,0 +1,34 @@
+"""Benchmark of loading the extension."""
+import importlib
+import sys
+
+import pytest
+import sphinx.application  # noqa: F401
+import sphinx.transforms.post_transforms  # noqa: F401
+import sphinx.util.docutils  # noqa: F401
+
+
+def _unload():
+    for name in list(sys.modules):
+        if name == "sphinx_timeline" or name.startswith("sphinx_timeline."):
+            del sys.modules[name]
+
+
+@pytest.fixture
+def unloaded():
+    """Restore the loaded modules of the extension, after re-importing them."""
+    modules = {
+        name: module
+        for name, module in sys.modules.items()
+        if name == "sphinx_timeline" or name.startswith("sphinx_timeline.")
+    }
+    yield
+    _unload()
+    sys.modules.update(modules)
+
+
+def test_import(benchmark, unloaded):
+    """Benchmark importing ``sphinx_timeline`` (from its bytecode cache), after Sphinx."""
+    benchmark.pedantic(
+        importlib.import_module, ("sphinx_timeline",), setup=_unload, rounds=20
+    )
@@ -0,0 +1,19 @@
+"""Benchmarks for parsing inline timeline events.
+
+Run with ``pytest benchmarks``;
+the parse time should grow linearly with the number of events.
+"""
+import pytest
+from sphinx_pytest.plugin import CreateDoctree
+
+
+@pytest.mark.parametrize("num_events", [10, 100, 1000])
+def test_inline_events(benchmark, sphinx_doctree: CreateDoctree, num_events):
+    """Benchmark a timeline with inline events."""
+    sphinx_doctree.set_conf({"extensions": ["sphinx_timeline"]})
+    events = "\n".join(
+        f"   - start: 2021-01-01 {idx // 60 % 24:02d}:{idx % 60:02d}"
+        for idx in range(num_events)
+    )
+    content = f".. timeline::\n   :max-items: 1\n\n{events}\n   ---\n   {{{{dt}}}}\n"
+    benchmark(sphinx_doctree, content)
@@ -0,0 +1,19 @@
+"""Benchmarks for the lanes layout."""
+import random
+
+import pytest
+
+from sphinx_timeline.layout import lane_positions
+
+
+@pytest.mark.parametrize("num_items", [1000, 10000, 100000])
+def test_lane_positions(benchmark, num_items):
+    """Benchmark computing the lanes, for items spread over ten years."""
+    day = 86_400_000_000
+    rng = random.Random(0)
+    spans = []
+    for _ in range(num_items):
+        start = rng.randrange(3650 * day)
+        spans.append((start, start + rng.randrange(30 * day)))
+    positions = benchmark(lane_positions, spans, 10, 280)
+    assert len(positions) == num_items
@@ -0,0 +1,74 @@
+"""Benchmarks for reading and normalising events files."""
+import pytest
+
+from sphinx_timeline.cli import main
+from sphinx_timeline.events import (
+    EventsCache,
+    cache_selection,
+    load_events,
+    read_events,
+    select_backend,
+)
+
+
+@pytest.mark.parametrize("num_events", [1000, 10000, 100000])
+@pytest.mark.parametrize("fmt", ["yaml", "json", "csv", "jsonl"])
+def test_read_events(benchmark, events_file, fmt, num_events):
+    """Benchmark parsing an events file."""
+    path = events_file(fmt, num_events)
+
+    def _read():
+        with path.open(encoding="utf8", newline="") as handle:
+            return read_events(handle, fmt)
+
+    assert len(benchmark.pedantic(_read, rounds=3)) == num_events
+
+
+@pytest.mark.parametrize("limit", [None, 5])
+@pytest.mark.parametrize("fmt", ["json", "jsonl"])
+def test_load_events(benchmark, events_file, fmt, limit):
+    """Benchmark parsing and normalising an events file."""
+    path = events_file(fmt, 100000)
+
+    def _load():
+        with path.open(encoding="utf8", newline="") as handle:
+            return load_events(handle, fmt, limit)
+
+    benchmark.pedantic(_load, rounds=3)
+
+
+@pytest.mark.parametrize("backend", ["python", "auto"])
+@pytest.mark.parametrize("fmt", ["yaml", "json", "jsonl"])
+def test_read_events_backend(benchmark, events_file, fmt, backend):
+    """Benchmark parsing an events file, with the pure Python or C parsers."""
+    path = events_file(fmt, 10000)
+    benchmark.extra_info["backends"] = select_backend(backend)
+
+    def _read():
+        with path.open(encoding="utf8", newline="") as handle:
+            return read_events(handle, fmt)
+
+    try:
+        assert len(benchmark.pedantic(_read, rounds=3)) == 10000
+    finally:
+        select_backend("auto")
+
+
+@pytest.mark.parametrize("limit", [None, 5])
+@pytest.mark.parametrize("fmt", ["jsonl", "tlbin"])
+def test_select_compiled(benchmark, events_file, tmp_path, fmt, limit):
+    """Benchmark reading and selecting events, from a text or compiled file (uncached)."""
+    path = events_file("jsonl", 100000)
+    if fmt == "tlbin":
+        path = tmp_path / "events.tlbin"
+        assert (
+            main(["compile", str(events_file("jsonl", 100000)), "-o", str(path)]) == 0
+        )
+
+    def _select():
+        events = EventsCache().get(
+            path, fmt, "index", cache_selection(fmt, limit, True)
+        )
+        return events.select(limit)
+
+    assert len(benchmark.pedantic(_select, rounds=3)) == (limit or 100000)
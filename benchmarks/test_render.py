@@ -0,0 +1,22 @@
+"""Benchmarks for rendering and parsing timeline items."""
+import pytest
+from sphinx_pytest.plugin import CreateDoctree
+import yaml
+
+
+@pytest.mark.parametrize("chunk_size", [1, 100])
+@pytest.mark.parametrize("num_items", [10, 1000, 10000])
+def test_render_items(benchmark, sphinx_doctree: CreateDoctree, chunk_size, num_items):
+    """Benchmark parsing items separately, against in chunks."""
+    sphinx_doctree.set_conf(
+        {"extensions": ["sphinx_timeline"], "timeline_parse_chunk_size": chunk_size}
+    )
+    events = [
+        {"start": f"2021-01-01 {idx // 60 % 24:02d}:{idx % 60:02d}", "name": idx}
+        for idx in range(num_items)
+    ]
+    sphinx_doctree.srcdir.joinpath("events.yaml").write_text(yaml.dump(events))
+    content = (
+        ".. timeline::\n   :events: events.yaml\n\n   **{{dt}}**\n\n   - {{e.name}}\n"
+    )
+    benchmark.pedantic(sphinx_doctree, (content,), rounds=3)
@@ -0,0 +1,32 @@
+"""Benchmarks for the columnar event store."""
+import pickle
+
+import pytest
+
+from sphinx_timeline.events import load_events, select_events
+from sphinx_timeline.store import EventStore
+
+
+@pytest.fixture(scope="module")
+def events(events_file):
+    with events_file("json", 100000).open(encoding="utf8") as handle:
+        return load_events(handle, "json")
+
+
+@pytest.mark.parametrize("store", [False, True], ids=["dicts", "store"])
+def test_pickle(benchmark, events, store):
+    """Benchmark pickling 100k events, to and from the environment."""
+    data = EventStore.from_events(events) if store else events
+    size = len(benchmark(pickle.dumps, data))
+    benchmark.extra_info["pickled_bytes"] = size
+
+
+@pytest.mark.parametrize("limit", [10, None])
+@pytest.mark.parametrize("store", [False, True], ids=["dicts", "store"])
+def test_select(benchmark, events, store, limit):
+    """Benchmark selecting (sorted) events, from 100k events."""
+    if store:
+        data = EventStore.from_events(events)
+        benchmark(data.select, limit)
+    else:
+        benchmark(select_events, events, limit)
@@ -0,0 +1,74 @@
+"""The ``sphinx-timeline`` command line interface."""
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+import sys
+
+from sphinx_timeline.compiled import COMPILED_FORMAT, write_compiled
+from sphinx_timeline.events import TEXT_FORMATS, load_events
+from sphinx_timeline.store import EventStore
+
+SUFFIX_FORMATS = {
+    ".yaml": "yaml",
+    ".yml": "yaml",
+    ".json": "json",
+    ".jsonl": "jsonl",
+    ".csv": "csv",
+}
+"""The events format of each file extension."""
+
+
+def compile_events(source: Path, fmt: str, output: Path) -> int:
+    """Compile an events file, for memory-mapped reading.
+
+    :returns: the number of events
+    :raises ValueError: if the data cannot be parsed, is invalid, or cannot be compiled
+    """
+    with source.open(encoding="utf8", newline="") as handle:
+        store = EventStore.from_events(load_events(handle, fmt))
+    write_compiled(store, output)
+    return len(store)
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Run the command line interface."""
+    parser = argparse.ArgumentParser(prog="sphinx-timeline")
+    commands = parser.add_subparsers(dest="command", required=True)
+    compile_parser = commands.add_parser(
+        "compile",
+        help=f"compile an events file to the binary {COMPILED_FORMAT!r} format",
+        description="Compile an events file to the binary "
+        f"{COMPILED_FORMAT!r} format, which is read memory-mapped "
+        f"(with 'events-format: {COMPILED_FORMAT}').",
+    )
+    compile_parser.add_argument("source", type=Path, help="the events file")
+    compile_parser.add_argument(
+        "-f",
+        "--format",
+        choices=TEXT_FORMATS,
+        help="the format of the events file (default: from its extension)",
+    )
+    compile_parser.add_argument(
+        "-o",
+        "--output",
+        type=Path,
+        help=f"the compiled file (default: the events file, with a .{COMPILED_FORMAT} extension)",
+    )
+    args = parser.parse_args(argv)
+
+    fmt = args.format or SUFFIX_FORMATS.get(args.source.suffix.lower())
+    if fmt is None:
+        parser.error(f"cannot infer the format of {args.source}, use --format")
+    output = args.output or args.source.with_suffix(f".{COMPILED_FORMAT}")
+    try:
+        count = compile_events(args.source, fmt, output)
+    except (OSError, ValueError) as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 1
+    print(f"Compiled {count} events to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+"""Collection of events across documents, for timelines using the ``collect`` option.
+
+Events recorded by ``timeline-event`` directives are stored on the build environment,
+with a sorted index per tag, which is updated incrementally as documents are read or removed.
+Collecting timelines are filled in when their document is written,
+so documents only need to be re-written (not re-read) when their collected events change.
+"""
+from __future__ import annotations
+
+from bisect import bisect_left, insort
+import hashlib
+from typing import Any, Iterable
+
+from sphinx.application import Sphinx
+from sphinx.environment import BuildEnvironment
+
+from sphinx_timeline.store import utc_micros
+
+ALL_TAGS = "*"
+"""The tag to collect all events."""
+
+
+def tags_option(argument: str | None) -> list[str]:
+    """Convert a comma or space separated list of tags."""
+    if not argument:
+        raise ValueError("argument required but none supplied")
+    return argument.replace(",", " ").split()
+
+
+class CollectedEvents:
+    """The events recorded in all documents, indexed by tag and sorted by start."""
+
+    def __init__(self) -> None:
+        self.events: dict[str, list[dict[str, Any]]] = {}
+        """Mapping of docname -> events recorded in the document."""
+        self.index: dict[str, list[tuple[int, str, int]]] = {}
+        """Mapping of tag -> sorted ``(start, docname, position)`` of its events."""
+        self.collectors: dict[str, set[str]] = {}
+        """Mapping of docname -> the tags collected by timelines in the document."""
+        self.signatures: dict[str, str] = {}
+        """Mapping of docname -> signature of its collected events, when last updated."""
+
+    def add(self, docname: str, event: dict[str, Any]) -> None:
+        """Record an event of a document."""
+        events = self.events.setdefault(docname, [])
+        key = (utc_micros(event["start"]), docname, len(events))
+        events.append(event)
+        for tag in {ALL_TAGS, *event["tags"]}:
+            insort(self.index.setdefault(tag, []), key)
+
+    def add_collector(self, docname: str, tags: Iterable[str]) -> None:
+        """Record that a document has a timeline collecting these tags."""
+        self.collectors.setdefault(docname, set()).update(tags)
+
+    def purge_doc(self, docname: str) -> None:
+        """Remove the events and collectors of a document."""
+        self.collectors.pop(docname, None)
+        self.signatures.pop(docname, None)
+        events = self.events.pop(docname, [])
+        for tag in {ALL_TAGS, *(tag for event in events for tag in event["tags"])}:
+            if tag in self.index:
+                self.index[tag] = [key for key in self.index[tag] if key[1] != docname]
+
+    def merge(self, other: CollectedEvents, docnames: Iterable[str]) -> None:
+        """Merge in the events and collectors of documents (e.g. from a parallel read)."""
+        for docname in docnames:
+            self.purge_doc(docname)
+            for event in other.events.get(docname, []):
+                self.add(docname, event)
+            if docname in other.collectors:
+                self.add_collector(docname, other.collectors[docname])
+
+    def select(
+        self,
+        tags: Iterable[str],
+        limit: int | None = None,
+        newest_first: bool = True,
+        start: Any = None,
+        end: Any = None,
+    ) -> list[dict[str, Any]]:
+        """Select the events with any of the tags, sorted by start.
+
+        Events with the same start are sorted by document.
+        """
+        tags = set(tags)
+        keys: list[tuple[int, str, int]]
+        if len(tags) == 1:
+            keys = self.index.get(tags.pop(), [])
+        else:
+            keys = sorted({key for tag in tags for key in self.index.get(tag, ())})
+        # the keys are sorted by start, so the range is found by binary search
+        lower = 0 if start is None else bisect_left(keys, (utc_micros(start),))
+        upper = len(keys) if end is None else bisect_left(keys, (utc_micros(end) + 1,))
+        keys = keys[lower:upper]
+        if newest_first:
+            keys.reverse()
+        return [self.events[docname][pos] for _, docname, pos in keys[:limit]]
+
+    def signature(self, tags: Iterable[str]) -> str:
+        """Compute a signature of the events with any of the tags."""
+        digest = hashlib.sha256()
+        for event in self.select(tags, newest_first=False):
+            digest.update(repr(sorted(event.items())).encode("utf8"))
+        return digest.hexdigest()
+
+
+def get_collected_events(env: BuildEnvironment) -> CollectedEvents:
+    """Get the collected events of the build environment, creating them if necessary."""
+    if not isinstance(getattr(env, "timeline_collected", None), CollectedEvents):
+        env.timeline_collected = CollectedEvents()  # type: ignore[attr-defined]
+    return env.timeline_collected  # type: ignore[attr-defined]
+
+
+def purge_collected_events(app: Sphinx, env: BuildEnvironment, docname: str) -> None:
+    """Remove the events of a document, that is being re-read or removed."""
+    get_collected_events(env).purge_doc(docname)
+
+
+def merge_collected_events(
+    app: Sphinx, env: BuildEnvironment, docnames: set[str], other: BuildEnvironment
+) -> None:
+    """Merge the events of a parallel read process."""
+    get_collected_events(env).merge(get_collected_events(other), docnames)
+
+
+def update_collectors(app: Sphinx, env: BuildEnvironment) -> list[str]:
+    """Return the documents with collecting timelines, whose events have changed,
+    so that they are re-written.
+    """
+    collected = get_collected_events(env)
+    updated = []
+    for docname, tags in collected.collectors.items():
+        signature = collected.signature(tags)
+        if collected.signatures.get(docname) != signature:
+            collected.signatures[docname] = signature
+            updated.append(docname)
+    return updated
@@ -0,0 +1,275 @@
+"""A compiled, binary events format (``tlbin``), which is read memory-mapped.
+
+Compiling an events file (with ``sphinx-timeline compile``)
+validates and normalises its events once, and writes them as an ``EventStore``,
+with little-endian, 8-byte aligned sections:
+
+- a header: the magic bytes, format version, number of events, size of the metadata,
+  and a SHA-256 digest of the rest of the file
+- the metadata, as JSON: the time zone, duration and field name tables
+- fixed-width columns: the UTC epoch microsecond starts (``int64``),
+  the starts in sorted order (``int64``), the indices of the events sorted by start,
+  oldest and newest first (``uint32``), the zone, duration and field indices (``uint32``),
+  and the offsets of each event's values in the string heap (``uint64``)
+- the string heap: the other values of each event, as UTF-8 JSON
+
+When read, the columns are memory views of the mapped file (without copying),
+so selecting the first ``max-items`` events, or a range of starts,
+only reads and decodes the selected records.
+"""
+from __future__ import annotations
+
+from array import array
+from datetime import date, time, timedelta, timezone, tzinfo
+import hashlib
+import json
+import mmap
+import os
+from pathlib import Path
+import struct
+import sys
+from typing import Any, Sequence
+
+from sphinx_timeline import dtime
+from sphinx_timeline.store import EventStore
+
+COMPILED_FORMAT = "tlbin"
+"""The name of the compiled events format."""
+VERSION = 1
+"""The version of the compiled events format."""
+
+MAGIC = b"\x89TLBIN\r\n"
+HEADER = struct.Struct("<8sIIQ32s")
+"""The magic bytes, format version, number of events, metadata size and content digest."""
+COLUMNS = (
+    ("starts", "q"),
+    ("sorted_starts", "q"),
+    ("oldest_first", "I"),
+    ("newest_first", "I"),
+    ("zone_index", "I"),
+    ("duration_index", "I"),
+    ("field_index", "I"),
+    ("offsets", "Q"),
+)
+"""The fixed-width columns, in order, with their type codes."""
+DURATION_UNITS = (
+    "years",
+    "months",
+    "days",
+    "hours",
+    "minutes",
+    "seconds",
+    "microseconds",
+)
+"""The units of durations, as ``relativedelta`` attributes."""
+
+_BYTESWAP = sys.byteorder != "little"
+
+
+def _padding(size: int) -> int:
+    return -size % 8
+
+
+def _zone_name(tz: tzinfo) -> str | None:
+    """Get the IANA name of a time zone, or ``None`` for a fixed UTC offset."""
+    if isinstance(tz, timezone):
+        return None
+    name = getattr(tz, "key", None)  # ZoneInfo
+    if not isinstance(name, str):
+        raise ValueError(f"Cannot compile time zone: {tz!r}")
+    return name
+
+
+def _json_default(value: Any) -> Any:
+    # dates and times (e.g. from YAML) are stored as they are shown in templates
+    if isinstance(value, (date, time)):
+        return str(value)
+    raise TypeError(f"value of type {type(value).__name__} is not JSON serializable")
+
+
+def write_compiled(store: EventStore, path: str | Path) -> None:
+    """Write a store of events to a compiled events file.
+
+    The file is written to a temporary file, then moved into place,
+    so that it is never read partially written.
+
+    :raises ValueError: if a time zone or value cannot be compiled
+    """
+    heap = bytearray()
+    offsets = array("Q", [0])
+    for idx, values in enumerate(store.values):
+        try:
+            heap += json.dumps(
+                list(values),
+                ensure_ascii=False,
+                separators=(",", ":"),
+                default=_json_default,
+            ).encode("utf8")
+        except (TypeError, ValueError) as exc:
+            raise ValueError(f"item {idx}: cannot compile values: {exc}") from exc
+        offsets.append(len(heap))
+    meta = json.dumps(
+        {
+            "zones": [[_zone_name(tz), offset] for tz, offset in store.zones],
+            "durations": [
+                None
+                if delta is None
+                else {
+                    unit: getattr(delta, unit)
+                    for unit in DURATION_UNITS
+                    if getattr(delta, unit)
+                }
+                for delta in store.durations
+            ],
+            "fields": [list(fields) for fields in store.fields],
+        }
+    ).encode("utf8")
+    oldest_first = store.order(False)
+    columns = {
+        "starts": store.starts,
+        "sorted_starts": array("q", (store.starts[idx] for idx in oldest_first)),
+        "oldest_first": oldest_first,
+        "newest_first": store.order(True),
+        "zone_index": array("I", store.zone_index),
+        "duration_index": array("I", store.duration_index),
+        "field_index": array("I", store.field_index),
+        "offsets": offsets,
+    }
+
+    sections = [meta + b"\0" * _padding(len(meta))]
+    for name, typecode in COLUMNS:
+        column = columns[name]
+        if _BYTESWAP:
+            column = array(typecode, column)
+            column.byteswap()
+        data = column.tobytes()
+        sections.append(data + b"\0" * _padding(len(data)))
+    sections.append(bytes(heap))
+    digest = hashlib.sha256()
+    for section in sections:
+        digest.update(section)
+
+    path = Path(path)
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with tmp_path.open("wb") as handle:
+        handle.write(
+            HEADER.pack(MAGIC, VERSION, len(store), len(meta), digest.digest())
+        )
+        handle.writelines(sections)
+    os.replace(tmp_path, path)
+
+
+def compiled_digest(path: str | Path) -> str | None:
+    """Get the content digest of a compiled events file, stored when it was compiled,
+    so that the file does not have to be read to track it as a dependency.
+
+    :returns: the hex digest, or ``None`` if the file is not a compiled events file
+    """
+    with open(path, "rb") as handle:
+        header = handle.read(HEADER.size)
+    if len(header) < HEADER.size or not header.startswith(MAGIC):
+        return None
+    _, version, _, _, digest = HEADER.unpack(header)
+    return digest.hex() if version == VERSION else None
+
+
+class _Heap:
+    """The values of each event, decoded from the string heap when accessed."""
+
+    __slots__ = ("offsets", "data", "base")
+
+    def __init__(self, offsets: Sequence[int], data: mmap.mmap, base: int) -> None:
+        self.offsets = offsets
+        self.data = data
+        self.base = base
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index: int) -> list:
+        base = self.base
+        return json.loads(
+            self.data[base + self.offsets[index] : base + self.offsets[index + 1]]
+        )
+
+
+class CompiledEvents(EventStore):
+    """A store of events, read from a memory-mapped compiled events file.
+
+    This is not cached on (or pickled with) the build environment,
+    since opening the file only reads its header and metadata.
+    """
+
+    __slots__ = ("_map",)
+
+    @classmethod
+    def open(cls, path: str | Path) -> CompiledEvents:
+        """Open a compiled events file.
+
+        :raises ValueError: if the file is not a valid compiled events file
+        """
+        store = cls()
+        with open(path, "rb") as handle:
+            try:
+                store._map = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:  # empty file
+                raise ValueError(f"Not a compiled events file: {path}") from None
+        data = store._map
+        if len(data) < HEADER.size or data[: len(MAGIC)] != MAGIC:
+            raise ValueError(f"Not a compiled events file: {path}")
+        _, version, count, meta_size, _ = HEADER.unpack_from(data)
+        if version != VERSION:
+            raise ValueError(
+                f"Unsupported compiled events version {version} (expected {VERSION}), "
+                f"re-compile the file: {path}"
+            )
+        position = HEADER.size + meta_size + _padding(meta_size)
+        view = memoryview(data)
+        columns: dict[str, Sequence[int]] = {}
+        for name, typecode in COLUMNS:
+            size = (count + (name == "offsets")) * array(typecode).itemsize
+            if position + size > len(data):
+                raise ValueError(f"Truncated compiled events file: {path}")
+            column: Any = view[position : position + size].cast(typecode)
+            if _BYTESWAP:
+                column = array(typecode, column)
+                column.byteswap()
+            columns[name] = column
+            position += size + _padding(size)
+        if columns["offsets"][count] != len(data) - position:
+            raise ValueError(f"Truncated compiled events file: {path}")
+
+        meta = json.loads(data[HEADER.size : HEADER.size + meta_size])
+        store.zones = [
+            (
+                timezone(timedelta(microseconds=offset))
+                if name is None
+                else dtime.get_timezone(name),
+                offset,
+            )
+            for name, offset in meta["zones"]
+        ]
+        if len(meta["durations"]) > 1:
+            from dateutil.relativedelta import relativedelta
+
+            store.durations = [
+                None if units is None else relativedelta(**units)
+                for units in meta["durations"]
+            ]
+        store.fields = [tuple(fields) for fields in meta["fields"]]
+
+        store.starts = columns["starts"]  # type: ignore[assignment]
+        store.zone_index = columns["zone_index"]  # type: ignore[assignment]
+        store.duration_index = columns["duration_index"]  # type: ignore[assignment]
+        store.field_index = columns["field_index"]  # type: ignore[assignment]
+        store.values = _Heap(columns["offsets"], data, position)  # type: ignore[assignment]
+        # the pre-sorted index, so that sorting and range selection are slices and binary searches
+        store._orders = {
+            False: columns["oldest_first"],  # type: ignore[dict-item]
+            True: columns["newest_first"],  # type: ignore[dict-item]
+        }
+        store._sorted_starts = columns["sorted_starts"]  # type: ignore[assignment]
+        return store
+
+    def __getstate__(self) -> dict[str, Any]:
+        raise TypeError("Compiled events cannot be pickled")
@@ -0,0 +1,107 @@
+"""Content-hash based dependency tracking, for timeline input files.
+
+Sphinx's own dependency tracking (``env.note_dependency``) re-reads a document
+whenever a dependency's modification time changes.
+Here, documents are only re-read when the content of an input file changes.
+"""
+from __future__ import annotations
+
+import os
+
+from sphinx.application import Sphinx
+from sphinx.environment import BuildEnvironment
+from sphinx.util import logging
+
+from sphinx_timeline.compiled import compiled_digest
+from sphinx_timeline.events import _file_digest
+
+LOGGER = logging.getLogger(__name__)
+
+_DIGESTS: dict[str, tuple[int, int, str]] = {}
+"""Memoised file digests, keyed by path and validated by (mtime, size)."""
+
+
+def file_digest(path: str) -> str:
+    """Compute the hash of a file's content, re-using it if the file is unchanged.
+
+    For compiled events files, the digest stored in their header is used,
+    rather than reading the whole file.
+    """
+    stat = os.stat(path)
+    cached = _DIGESTS.get(path)
+    if cached is not None and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+        return cached[2]
+    digest = compiled_digest(path) or _file_digest(path)
+    _DIGESTS[path] = (stat.st_mtime_ns, stat.st_size, digest)
+    return digest
+
+
+def get_dependencies(env: BuildEnvironment) -> dict[str, dict[str, tuple[int, str]]]:
+    """Get the mapping of docname -> {path: (mtime, digest)}, creating it if necessary."""
+    if not isinstance(getattr(env, "timeline_dependencies", None), dict):
+        env.timeline_dependencies = {}  # type: ignore[attr-defined]
+    return env.timeline_dependencies  # type: ignore[attr-defined]
+
+
+def note_content_dependency(env: BuildEnvironment, path: str) -> None:
+    """Add a file as a dependency of the current document, keyed on its content."""
+    path = os.path.normpath(os.path.abspath(path))
+    get_dependencies(env).setdefault(env.docname, {})[path] = (
+        os.stat(path).st_mtime_ns,
+        file_digest(path),
+    )
+
+
+def purge_dependencies(app: Sphinx, env: BuildEnvironment, docname: str) -> None:
+    """Remove the dependencies of a document, that is being re-read or removed."""
+    get_dependencies(env).pop(docname, None)
+
+
+def merge_dependencies(
+    app: Sphinx, env: BuildEnvironment, docnames: set[str], other: BuildEnvironment
+) -> None:
+    """Merge the dependencies of a parallel read process."""
+    other_deps = get_dependencies(other)
+    deps = get_dependencies(env)
+    for docname in docnames:
+        if docname in other_deps:
+            deps[docname] = other_deps[docname]
+
+
+def get_outdated(
+    app: Sphinx,
+    env: BuildEnvironment,
+    added: set[str],
+    changed: set[str],
+    removed: set[str],
+) -> list[str]:
+    """Return the documents whose timeline input files have changed content.
+
+    Files that have been modified, but have the same content, do not cause a re-read.
+    """
+    outdated = []
+    for docname, paths in get_dependencies(env).items():
+        if docname in changed or docname in removed:
+            continue
+        skipped = []
+        for path, (mtime_ns, digest) in paths.items():
+            try:
+                new_mtime_ns = os.stat(path).st_mtime_ns
+                if new_mtime_ns == mtime_ns:
+                    continue
+                if file_digest(path) != digest:
+                    outdated.append(docname)
+                    break
+            except OSError:
+                outdated.append(docname)
+                break
+            paths[path] = (new_mtime_ns, digest)
+            skipped.append(path)
+        else:
+            if skipped:
+                LOGGER.verbose(
+                    "[timeline] %s: skipping re-read, content unchanged for: %s",
+                    docname,
+                    ", ".join(os.path.relpath(path, env.srcdir) for path in skipped),
+                )
+    return outdated
@@ -1,40 +1,80 @@
-"""Utilities for parsing and formatting dates and times."""
+"""Utilities for parsing and formatting dates and times.
+
+``dateutil`` and ``zoneinfo`` are only imported when first used.
+"""
 from __future__ import annotations
 
-from datetime import date, datetime, time, timezone
+from datetime import date, datetime, time, timezone, tzinfo
+from functools import lru_cache
 import re
+from typing import TYPE_CHECKING, Any, Iterable
 
-from dateutil.relativedelta import relativedelta
-
-try:
-    import zoneinfo
-except ImportError:
-    from backports import zoneinfo  # noqa: F401
+if TYPE_CHECKING:
+    from dateutil.relativedelta import relativedelta
 
 
 RE_ISO_TZ = re.compile(r"(?P<dt>.+)\((?P<tz>[^)]+)\)\s*$")
+RE_DURATION = re.compile(r"(\d+)\s?(mon|min|y|d|h|s)")
+DURATION_UNITS = {
+    "y": "years",
+    "mon": "months",
+    "d": "days",
+    "h": "hours",
+    "min": "minutes",
+    "s": "seconds",
+}
+
+
+def __getattr__(name: str) -> Any:
+    # lazily import the (previously module level) dependencies
+    if name == "relativedelta":
+        from dateutil.relativedelta import relativedelta
+
+        return relativedelta
+    if name == "zoneinfo":
+        try:
+            import zoneinfo
+        except ImportError:
+            from backports import zoneinfo  # type: ignore[no-redef]
+        return zoneinfo
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+@lru_cache(maxsize=None)
+def get_timezone(name: str) -> tzinfo:
+    """Get a timezone by its IANA name (cached)."""
+    try:
+        return __getattr__("zoneinfo").ZoneInfo(name)
+    except Exception as exc:
+        raise ValueError(
+            f"Invalid timezone: {name!r}"
+            # f"\navailable: {zoneinfo.available_timezones()!r}"
+        ) from exc
+
+
+@lru_cache(maxsize=8192)
+def _str_to_datetime(value: str, default_tz: tzinfo) -> datetime:
+    """Convert a string to a timezone-aware datetime object (memoised)."""
+    # find timezone name suffix in parentheses
+    tz_match = RE_ISO_TZ.match(value) if "(" in value else None
+    if tz_match:
+        # parse datetime with timezone
+        final = datetime.fromisoformat(tz_match.group("dt").strip())
+        final = final.replace(tzinfo=get_timezone(tz_match.group("tz")))
+    else:
+        # parse datetime without timezone
+        final = datetime.fromisoformat(value.strip())
+    # if not timezone aware, assume UTC
+    if final.tzinfo is None:
+        final = final.replace(tzinfo=default_tz)
+    return final
 
 
 def to_datetime(value: str | date | datetime, default_tz=timezone.utc) -> datetime:
     """Convert to a timezone-aware datetime object."""
     final: datetime
     if isinstance(value, str):
-        # find timezone name suffix in parentheses
-        tz_match = RE_ISO_TZ.match(value)
-        if tz_match:
-            # parse datetime with timezone
-            final = datetime.fromisoformat(tz_match.group("dt").strip())
-            try:
-                tz = zoneinfo.ZoneInfo(tz_match.group("tz"))
-            except Exception as exc:
-                raise ValueError(
-                    f"Invalid timezone: {tz_match.group('tz')!r}"
-                    # f"\navailable: {zoneinfo.available_timezones()!r}"
-                ) from exc
-            final = final.replace(tzinfo=tz)
-        else:
-            # parse datetime without timezone
-            final = datetime.fromisoformat(value.strip())
+        return _str_to_datetime(value, default_tz)
     elif isinstance(value, date):
         final = datetime(value.year, value.month, value.day)
     elif not isinstance(value, datetime):
@@ -45,23 +85,52 @@ def to_datetime(value: str | date | datetime, default_tz=timezone.utc) -> dateti
     return final
 
 
+def to_datetimes(
+    values: Iterable[str | date | datetime], default_tz=timezone.utc
+) -> list[datetime]:
+    """Convert multiple values to timezone-aware datetime objects."""
+    _convert = _str_to_datetime
+    return [
+        _convert(value, default_tz)
+        if isinstance(value, str)
+        else to_datetime(value, default_tz)
+        for value in values
+    ]
+
+
 def parse_duration(value: str) -> relativedelta:
-    """Parse a duration string."""
+    """Parse a duration string.
+
+    Note, the returned object is memoised, and so should not be mutated.
+    """
     if not isinstance(value, str):
         raise TypeError(f"not str: {type(value)}")
-    delta = {}
-    if year_match := re.search(r"(\d+)\s?y", value):
-        delta["years"] = int(year_match.group(1))
-    if month_match := re.search(r"(\d+)\s?mon", value):
-        delta["months"] = int(month_match.group(1))
-    if day_match := re.search(r"(\d+)\s?d", value):
-        delta["days"] = int(day_match.group(1))
-    if hour_match := re.search(r"(\d+)\s?h", value):
-        delta["hours"] = int(hour_match.group(1))
-    if minute_match := re.search(r"(\d+)\s?min", value):
-        delta["minutes"] = int(minute_match.group(1))
-    if second_match := re.search(r"(\d+)\s?s", value):
-        delta["seconds"] = int(second_match.group(1))
+    return _parse_duration(value)
+
+
+def relative_datetime(value: str, now: datetime, past: bool = True) -> datetime:
+    """Parse a time relative to ``now``, either ``now`` or a duration, e.g. ``90 days``.
+
+    :param past: whether the duration is before ``now``, otherwise it is after
+    """
+    value = value.strip()
+    if value.lower() == "now":
+        return now
+    if not RE_DURATION.search(value):
+        raise ValueError(f"Invalid relative time (use 'now' or a duration): {value!r}")
+    delta = parse_duration(value)
+    return now - delta if past else now + delta
+
+
+@lru_cache(maxsize=1024)
+def _parse_duration(value: str) -> relativedelta:
+    """Parse a duration string (memoised)."""
+    from dateutil.relativedelta import relativedelta
+
+    delta: dict[str, int] = {}
+    for number, unit in RE_DURATION.findall(value):
+        # the first occurrence of a unit takes precedence
+        delta.setdefault(DURATION_UNITS[unit], int(number))
     return relativedelta(**delta)
 
 
@@ -85,47 +154,83 @@ def fmt_daterange(
     :param abbr: use abbreviated day/month name (e.g. "Mon")
     :param clock12: use AM/PM time format
     """
+    end = start if duration is None else start + duration
+    single = start == end
+    start_time = start.time()
+    no_time = start_time == time(0) and (single or start_time == end.time())
+    same_date = (not single) and start.date() == end.date()
+    start_fmt, end_fmt = _daterange_formats(
+        day_name,
+        short_date,
+        short_delim,
+        abbr,
+        clock12,
+        bool(start.tzinfo),
+        single,
+        same_date,
+        no_time,
+        start.year == end.year,
+        start.month == end.month,
+    )
+
+    if single:
+        return fmt_datetime(start, start_fmt)
+    if same_date:
+        return f"{fmt_datetime(start, start_fmt)} - {fmt_datetime(end, end_fmt)}"
+    return f"{fmt_datetime(start, start_fmt).rstrip()} - {fmt_datetime(end, end_fmt)}"
+
+
+@lru_cache(maxsize=256)
+def _daterange_formats(
+    day_name: bool,
+    short_date: bool,
+    short_delim: str,
+    abbr: bool,
+    clock12: bool,
+    has_tz: bool,
+    single: bool,
+    same_date: bool,
+    no_time: bool,
+    same_year: bool,
+    same_month: bool,
+) -> tuple[str, str]:
+    """Compute the (start, end) strftime formats for a datetime span (memoised)."""
     day_name_code = ("%a " if abbr else "%A ") if day_name else ""
     day_code = f"%d{short_delim}" if short_date else "%D "
     month_code = f"%m{short_delim}" if short_date else ("%b " if abbr else "%B ")
     time_code = "%I:%M %p" if clock12 else "%H:%M"
-    tz_code = " (%Z)" if start.tzinfo else ""
+    tz_code = " (%Z)" if has_tz else ""
 
     start_fmt = f"{day_name_code}{day_code}{month_code}%Y, {time_code}{tz_code}"
     end_fmt = f"{day_name_code}{day_code}{month_code}%Y, {time_code}{tz_code}"
 
-    if duration is None:
-        end = start
-    else:
-        end = start + duration
-
-    if start == end:
-        if start.time() == time(0):
+    if single:
+        if no_time:
             # remove time from start format
             start_fmt = start_fmt.split(",")[0]
-        return fmt_datetime(start, start_fmt)
+        return start_fmt, start_fmt
 
     # remove timezone from start format
     start_fmt = start_fmt.replace(tz_code, "")
 
-    if start.date() == end.date():
+    if same_date:
         # remove date from end format
         end_fmt = end_fmt.split(",")[1].lstrip()
-        return f"{fmt_datetime(start, start_fmt)} - {fmt_datetime(end, end_fmt)}"
+        return start_fmt, end_fmt
 
     # assume if the start time is 00:00:00, it was set without a time
-    if start.time() == time(0) and start.time() == end.time():
+    if no_time:
         # remove time from start and end format
         start_fmt = start_fmt.split(",")[0]
         end_fmt = end_fmt.split(",")[0]
 
-    if not short_date and start.year == end.year:
+    if not short_date and same_year:
         start_fmt = start_fmt.replace(" %Y", "")
-        if start.month == end.month:
+        if same_month:
             start_fmt = start_fmt.replace(f"{month_code.rstrip()}", "")
             start_fmt = start_fmt.replace(" ,", ",")
 
-    return f"{fmt_datetime(start, start_fmt).rstrip()} - {fmt_datetime(end, end_fmt)}"
+    return start_fmt, end_fmt
 
 
 def _ord_suffix(n: int):
@@ -146,8 +251,9 @@ def fmt_datetime(dt: datetime, fmt: str) -> str:
     return dt.strftime(fmt)
 
 
+@lru_cache(maxsize=1024)
 def fmt_delta(delta: relativedelta | None) -> str:
-    """Format a relativedelta object."""
+    """Format a relativedelta object (memoised)."""
     if delta is None:
         return ""
 
@@ -174,15 +280,26 @@ def _s(n: int):
 
 
 class DtRangeStr:
-    """A datetime range string format."""
+    """A datetime range string format.
+
+    The string is only computed when first used, and memoised per format options.
+    """
+
+    __slots__ = ("_start", "_duration", "_cache")
 
     def __init__(self, start: datetime, duration: relativedelta | None = None) -> None:
         self._start = start
         self._duration = duration
-        self._default = fmt_daterange(start, duration)
+        self._cache: dict[tuple, str] | None = None
 
     def __str__(self) -> str:
-        return self._default
+        return self()
 
     def __call__(self, **kwargs) -> str:
-        return fmt_daterange(self._start, self._duration, **kwargs)
+        key = tuple(sorted(kwargs.items()))
+        if self._cache is None:
+            self._cache = {}
+        elif key in self._cache:
+            return self._cache[key]
+        value = self._cache[key] = fmt_daterange(self._start, self._duration, **kwargs)
+        return value
@@ -0,0 +1,628 @@
+"""Reading, validating and caching of timeline events.
+
+The parsers (and process pool) are only imported when events are first read,
+so that loading the extension stays cheap, for projects with few timelines.
+"""
+from __future__ import annotations
+
+from functools import partial
+import hashlib
+import heapq
+import importlib
+import itertools
+from operator import itemgetter
+import os
+from pathlib import Path
+import re
+from typing import Any, Callable, Iterable, Iterator, Literal, TextIO
+
+from sphinx.application import Sphinx
+from sphinx.environment import BuildEnvironment
+from sphinx.util import logging
+
+from sphinx_timeline import dtime
+from sphinx_timeline.compiled import COMPILED_FORMAT, CompiledEvents
+from sphinx_timeline.profiling import phase
+from sphinx_timeline.store import EventStore
+
+LOGGER = logging.getLogger(__name__)
+
+
+EVENTS_FORMATS = ("yaml", "json", "csv", "jsonl", COMPILED_FORMAT)
+"""The supported events formats."""
+TEXT_FORMATS = ("yaml", "json", "csv", "jsonl")
+"""The events formats that are parsed from text (and can be compiled)."""
+STREAM_FORMATS = ("csv", "jsonl")
+"""The events formats that can be read lazily, one event at a time."""
+NORMALISE_BATCH_SIZE = 1024
+"""The number of events to normalise at a time."""
+RANGE_OPTIONS = ("from", "to", "since", "until")
+"""The directive options that select a range of event starts."""
+EVENTS_BACKENDS = ("auto", "python")
+"""The choices of backends, to parse YAML and JSON events."""
+JSON_BACKENDS = ("orjson", "ujson")
+"""The optional JSON parsers, in order of preference, for the ``auto`` backend."""
+
+_LOADERS: dict[str, tuple[Callable[[str], Any], Callable[[str], Any]]] = {}
+"""The selected YAML and JSON parsers, and their pure Python fallbacks, of the current process."""
+_BACKEND = "auto"
+"""The configured backend, which is selected when events are first parsed."""
+
+
+def _check_backend(name: str) -> None:
+    if name not in EVENTS_BACKENDS:
+        raise ValueError(
+            f"Unknown events backend {name!r}, expected one of {EVENTS_BACKENDS}"
+        )
+
+
+def select_backend(name: str = "auto") -> dict[str, str]:
+    """Select the backends used to parse YAML and JSON events.
+
+    For ``auto``, YAML is parsed with the libyaml ``CSafeLoader`` (if available),
+    and JSON with the first installed of ``JSON_BACKENDS``.
+    Otherwise, the pure Python parsers are used.
+
+    :returns: the names of the selected YAML and JSON backends
+    :raises ValueError: if the name is not one of ``EVENTS_BACKENDS``
+    """
+    import json
+
+    import yaml
+
+    _check_backend(name)
+    names = {"yaml": "python", "json": "python"}
+    _LOADERS["yaml"] = (yaml.safe_load, yaml.safe_load)
+    _LOADERS["json"] = (json.loads, json.loads)
+    if name == "auto":
+        if getattr(yaml, "__with_libyaml__", False):
+            _LOADERS["yaml"] = (
+                partial(yaml.load, Loader=yaml.CSafeLoader),
+                yaml.safe_load,
+            )
+            names["yaml"] = "libyaml"
+        for module_name in JSON_BACKENDS:
+            try:
+                module = importlib.import_module(module_name)
+            except ImportError:
+                continue
+            _LOADERS["json"] = (module.loads, json.loads)
+            names["json"] = module_name
+            break
+    return names
+
+
+def _parse(fmt: Literal["yaml", "json"], text: str) -> Any:
+    """Parse YAML or JSON text with the selected backend,
+    falling back to the pure Python parser on failure (for consistent errors).
+    """
+    if not _LOADERS:
+        names = select_backend(_BACKEND)
+        LOGGER.verbose(
+            "[timeline] events backends: yaml=%s, json=%s", names["yaml"], names["json"]
+        )
+    loader, fallback = _LOADERS[fmt]
+    if loader is fallback:
+        return fallback(text)
+    try:
+        return loader(text)
+    except Exception:
+        return fallback(text)
+
+
+def read_events(
+    stream: TextIO, fmt: Literal["yaml", "json", "csv", "jsonl"]
+) -> list[dict[str, Any]]:
+    """Read events from a stream."""
+    if fmt in ("yaml", "json"):
+        return _parse(fmt, stream.read())  # type: ignore[arg-type]
+    if fmt in STREAM_FORMATS:
+        return list(iter_events(stream, fmt))
+    if fmt == COMPILED_FORMAT:
+        # the compiled format is memory-mapped, see ``CompiledEvents.open``
+        raise ValueError(f"The {fmt!r} format can only be read from a file")
+
+    raise ValueError(f"Unknown format: {fmt}")
+
+
+def iter_events(stream: TextIO, fmt: Literal["csv", "jsonl"]) -> Iterator[Any]:
+    """Lazily iterate over the events of a stream, one line at a time."""
+    if fmt == "csv":
+        import csv
+
+        return iter(csv.DictReader(stream))
+    if fmt == "jsonl":
+        return _iter_json_lines(stream)
+
+    raise ValueError(f"Format cannot be streamed: {fmt}")
+
+
+def _iter_json_lines(stream: TextIO) -> Iterator[Any]:
+    """Lazily parse the (non-empty) lines of a JSON lines stream.
+
+    :raises ValueError: if a line cannot be parsed, with its line number
+    """
+    for line_num, line in enumerate(stream, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield _parse("json", line)
+        except Exception as exc:
+            raise ValueError(f"line {line_num}: {exc}") from exc
+
+
+def normalise_event(idx: int, item: Any) -> dict[str, Any]:
+    """Validate an event, and convert its ``start`` and ``duration`` values.
+
+    :raises ValueError: if the event is invalid
+    """
+    if not isinstance(item, dict):
+        raise ValueError(f"item {idx}: each data item must be a dictionary")
+
+    if "start" not in item:
+        raise ValueError(f"item {idx}: each data item must contain 'start' key")
+    try:
+        item["start"] = dtime.to_datetime(item["start"])
+    except Exception as exc:
+        raise ValueError(f"item {idx}: error parsing 'start' value: {exc}") from exc
+
+    if "duration" in item:
+        try:
+            item["duration"] = dtime.parse_duration(item["duration"])
+        except Exception as exc:
+            raise ValueError(
+                f"item {idx}: error parsing 'duration' value: {exc}"
+            ) from exc
+
+    return item
+
+
+def iter_normalised_events(stream: TextIO, fmt: str) -> Iterator[dict[str, Any]]:
+    """Iterate over the validated and normalised events of a stream.
+
+    For the ``csv`` and ``jsonl`` formats, events are read lazily.
+
+    :raises ValueError: if the data cannot be parsed or is invalid
+    """
+    items: Iterator[Any]
+    if fmt in STREAM_FORMATS:
+        items = iter_events(stream, fmt)  # type: ignore[arg-type]
+    else:
+        try:
+            data = read_events(stream, fmt)  # type: ignore[arg-type]
+        except Exception as exc:
+            raise ValueError(f"Error parsing data: {exc}") from exc
+        if not isinstance(data, list):
+            raise ValueError("Data must be a list")
+        items = iter(data)
+
+    def _checked_items() -> Iterator[Any]:
+        while True:
+            try:
+                item = next(items)
+            except StopIteration:
+                return
+            except Exception as exc:
+                raise ValueError(f"Error parsing data: {exc}") from exc
+            yield item
+
+    checked_items = _checked_items()
+    for offset in itertools.count(0, NORMALISE_BATCH_SIZE):
+        batch = list(itertools.islice(checked_items, NORMALISE_BATCH_SIZE))
+        if not batch:
+            return
+        with phase("validate"):
+            events = normalise_events(batch, offset)
+        yield from events
+
+
+def normalise_events(items: list[Any], offset: int = 0) -> list[dict[str, Any]]:
+    """Validate events, and convert their ``start`` and ``duration`` values.
+
+    The ``start`` values are converted in bulk,
+    falling back to converting each event separately to report errors.
+
+    :param offset: the index of the first event, for error reporting
+    :raises ValueError: if an event is invalid
+    """
+    for idx, item in enumerate(items, offset):
+        if not isinstance(item, dict) or "start" not in item:
+            normalise_event(idx, item)  # raises the validation error
+    try:
+        starts = dtime.to_datetimes([item["start"] for item in items])
+    except Exception:
+        # convert separately, to report the failing event
+        return [normalise_event(idx, item) for idx, item in enumerate(items, offset)]
+    for idx, (item, start) in enumerate(zip(items, starts), offset):
+        item["start"] = start
+        if "duration" in item:
+            try:
+                item["duration"] = dtime.parse_duration(item["duration"])
+            except Exception as exc:
+                raise ValueError(
+                    f"item {idx}: error parsing 'duration' value: {exc}"
+                ) from exc
+    return items
+
+
+def select_events(
+    events: Iterable[dict[str, Any]], limit: int | None = None, newest_first=True
+) -> list[dict[str, Any]]:
+    """Sort events by their start.
+
+    :param limit: if given, only select the first ``limit`` events,
+        using a bounded heap, so that only ``limit`` events are held in memory.
+    :param newest_first: sort from the latest start to the earliest
+    """
+    key = itemgetter("start")
+    if limit:
+        select = heapq.nlargest if newest_first else heapq.nsmallest
+        return select(limit, events, key=key)
+    return sorted(events, key=key, reverse=newest_first)
+
+
+def load_events(
+    stream: TextIO, fmt: str, limit: int | None = None, newest_first: bool = True
+) -> list[dict[str, Any]]:
+    """Read events from a stream, then validate and normalise them.
+
+    :param limit: if given, only keep the first ``limit`` events, sorted by start
+        (otherwise all events are returned, in their original order)
+    :param newest_first: sort from the latest start to the earliest
+
+    :raises ValueError: if the data cannot be parsed or is invalid
+    """
+    events = iter_normalised_events(stream, fmt)
+    data = select_events(events, limit, newest_first) if limit else list(events)
+    if not data:
+        raise ValueError("Data must not be empty")
+    return data
+
+
+def _file_digest(path: str) -> str:
+    """Compute the hash of a file's content, without reading it all into memory."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class EventsCacheEntry:
+    """The normalised events of a single file."""
+
+    __slots__ = ("fmt", "mtime_ns", "size", "digest", "events", "docnames")
+
+    def __init__(
+        self,
+        fmt: str,
+        mtime_ns: int,
+        size: int,
+        digest: str,
+        events: EventStore,
+    ) -> None:
+        self.fmt = fmt
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.digest = digest
+        self.events = events
+        self.docnames: set[str] = set()
+
+    def __getstate__(self) -> dict[str, Any]:
+        return {key: getattr(self, key) for key in self.__slots__}
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        for key, value in state.items():
+            setattr(self, key, value)
+
+
+class EventsCache:
+    """A cache of normalised events, keyed by the absolute path and format of the events file.
+
+    Entries are validated against the file's modification time and size,
+    then against its content hash (so that re-generated but identical files are still hits).
+    The cache is stored on the build environment,
+    so that it is shared between directives and documents, and persists across incremental builds.
+    """
+
+    def __init__(self) -> None:
+        self.entries: dict[tuple[str, str, Any], EventsCacheEntry] = {}
+        # hit/miss counters per process, so that they can be merged after parallel reads
+        self.stats: dict[int, list[int]] = {}
+
+    @property
+    def hits(self) -> int:
+        """The number of cache hits."""
+        return sum(hits for hits, _ in self.stats.values())
+
+    @property
+    def misses(self) -> int:
+        """The number of cache misses."""
+        return sum(misses for _, misses in self.stats.values())
+
+    def reset_stats(self) -> None:
+        """Reset the hit/miss counters."""
+        self.stats = {}
+
+    def _count(self, hit: bool) -> None:
+        self.stats.setdefault(os.getpid(), [0, 0])[0 if hit else 1] += 1
+
+    def _lookup(
+        self, key: tuple[str, str, Any], stat: os.stat_result
+    ) -> tuple[EventsCacheEntry | None, str | None]:
+        """Lookup an up-to-date entry.
+
+        :returns: the entry (if up-to-date) and the file's digest (if computed)
+        """
+        entry = self.entries.get(key)
+        if entry is not None:
+            if (entry.mtime_ns, entry.size) == (stat.st_mtime_ns, stat.st_size):
+                return entry, None
+        digest = _file_digest(key[0])
+        if entry is not None and entry.digest == digest:
+            entry.mtime_ns, entry.size = stat.st_mtime_ns, stat.st_size
+            return entry, digest
+        return None, digest
+
+    def _store(
+        self,
+        key: tuple[str, str, Any],
+        stat: os.stat_result,
+        digest: str,
+        events: EventStore,
+    ) -> EventsCacheEntry:
+        entry = EventsCacheEntry(key[1], stat.st_mtime_ns, stat.st_size, digest, events)
+        if key in self.entries:
+            entry.docnames.update(self.entries[key].docnames)
+        self.entries[key] = entry
+        return entry
+
+    def get(
+        self,
+        path: str | Path,
+        fmt: str,
+        docname: str,
+        select: tuple[int, bool] | None = None,
+    ) -> EventStore:
+        """Get the normalised events of a file, reading it only if necessary.
+
+        :param select: ``(limit, newest_first)`` to only read (and cache)
+            the first ``limit`` events, after sorting.
+            For the streamable formats, only these events are held in memory.
+
+        Compiled files are memory-mapped, rather than read and cached.
+
+        :raises ValueError: if the data cannot be parsed or is invalid
+        """
+        if fmt == COMPILED_FORMAT:
+            return CompiledEvents.open(path)
+        key = (os.path.normpath(os.path.abspath(path)), fmt, select)
+        stat = os.stat(key[0])
+        entry, digest = self._lookup(key, stat)
+        self._count(entry is not None)
+        if entry is None:
+            events = _load_file(*key)
+            entry = self._store(key, stat, digest or _file_digest(key[0]), events)
+        entry.docnames.add(docname)
+        return entry.events
+
+    def preload(
+        self,
+        requests: dict[tuple[str, str, Any], set[str]],
+        processes: int = 1,
+        min_pool_size: int = 1 << 20,
+    ) -> int:
+        """Read and normalise all requested files that are not already cached.
+
+        Files of at least ``min_pool_size`` bytes are read in a process pool,
+        if ``processes > 1``. Files that fail to load are skipped,
+        so that the error is reported by the directive.
+
+        :param requests: mapping of cache keys to the documents using them
+        :returns: the number of files loaded
+        """
+        to_load: dict[tuple[str, str, Any], tuple[os.stat_result, str]] = {}
+        for key, docnames in requests.items():
+            try:
+                stat = os.stat(key[0])
+                entry, digest = self._lookup(key, stat)
+            except OSError:
+                continue
+            if entry is not None:
+                entry.docnames.update(docnames)
+            else:
+                to_load[key] = (stat, digest or _file_digest(key[0]))
+
+        pooled = [
+            key for key, (stat, _) in to_load.items() if stat.st_size >= min_pool_size
+        ]
+        if processes < 2 or len(pooled) < 2:
+            pooled = []
+        results: dict[tuple[str, str, Any], EventStore] = {}
+        if pooled:
+            from concurrent.futures import ProcessPoolExecutor
+
+            with ProcessPoolExecutor(max_workers=min(processes, len(pooled))) as pool:
+                futures = {key: pool.submit(_load_file, *key) for key in pooled}
+                for key, future in futures.items():
+                    try:
+                        results[key] = future.result()
+                    except Exception:
+                        pass
+        for key in to_load:
+            if key in pooled:
+                continue
+            try:
+                results[key] = _load_file(*key)
+            except Exception:
+                pass
+
+        for key, events in results.items():
+            self._count(False)
+            stat, digest = to_load[key]
+            self._store(key, stat, digest, events).docnames.update(requests[key])
+        return len(results)
+
+    def purge_doc(self, docname: str) -> None:
+        """Remove a document as a user of all entries."""
+        for entry in self.entries.values():
+            entry.docnames.discard(docname)
+
+    def merge(self, other: EventsCache) -> None:
+        """Merge in the entries of another cache (e.g. from a parallel read)."""
+        for key, other_entry in other.entries.items():
+            entry = self.entries.get(key)
+            if entry is not None and entry.digest == other_entry.digest:
+                entry.docnames.update(other_entry.docnames)
+                continue
+            if entry is not None:
+                other_entry.docnames.update(entry.docnames)
+            self.entries[key] = other_entry
+        for pid, counts in other.stats.items():
+            # the counters of this process were copied to the other, when it was forked
+            if pid != os.getpid():
+                self.stats[pid] = counts
+
+    def evict_stale(self) -> int:
+        """Remove entries that are no longer used by any document.
+
+        :returns: the number of evicted entries
+        """
+        stale = [key for key, entry in self.entries.items() if not entry.docnames]
+        for key in stale:
+            del self.entries[key]
+        return len(stale)
+
+
+def _load_file(path: str, fmt: str, select: tuple[int, bool] | None) -> EventStore:
+    """Read, validate and normalise the events of a file, into a compact store."""
+    with open(path, encoding="utf8", newline="") as handle:
+        return EventStore.from_events(load_events(handle, fmt, *(select or ())))
+
+
+def cache_selection(
+    fmt: str, limit: int | None, newest_first: bool
+) -> tuple[int, bool] | None:
+    """Return the selection of events to cache, for a file of this format.
+
+    Only for the streamable formats, is a selection cached instead of all events.
+    """
+    return (limit, newest_first) if limit and fmt in STREAM_FORMATS else None
+
+
+RE_TIMELINE_DIRECTIVE = re.compile(
+    r"^\s*(?:\.\.\s+timeline::|(?:`{3,}|~{3,}|:{3,})\s*\{timeline\})\s*$"
+)
+RE_DIRECTIVE_OPTION = re.compile(r"^\s*:(?P<key>[\w-]+):(?P<value>.*)$")
+
+
+def find_events_files(
+    env: BuildEnvironment, docnames: Iterable[str]
+) -> dict[tuple[str, str, Any], set[str]]:
+    """Find the events files referenced by ``timeline`` directives in documents.
+
+    This is a quick scan of the document sources,
+    for directive options (in reStructuredText or MyST syntax).
+
+    :returns: mapping of cache keys to the documents using them
+    """
+    requests: dict[tuple[str, str, Any], set[str]] = {}
+    for docname in docnames:
+        try:
+            text = Path(env.doc2path(docname)).read_text(encoding="utf8")
+        except (OSError, UnicodeDecodeError):
+            continue
+        if "timeline" not in text:
+            continue
+        lines = text.splitlines()
+        for idx, line in enumerate(lines):
+            if not RE_TIMELINE_DIRECTIVE.match(line):
+                continue
+            options = {}
+            for option_line in lines[idx + 1 :]:
+                match = RE_DIRECTIVE_OPTION.match(option_line)
+                if not match:
+                    break
+                options[match.group("key")] = match.group("value").strip()
+            if not options.get("events"):
+                continue
+            fmt = options.get("events-format", "yaml")
+            if fmt == COMPILED_FORMAT:
+                # memory-mapped when read, so there is nothing to preload
+                continue
+            try:
+                limit = int(options.get("max-items") or 0) or None
+            except ValueError:
+                continue
+            if any(name in options for name in RANGE_OPTIONS):
+                # the limit is applied after filtering
+                limit = None
+            _, abspath = env.relfn2path(options["events"], docname)
+            key = (
+                os.path.normpath(os.path.abspath(abspath)),
+                fmt,
+                cache_selection(fmt, limit, "reversed" not in options),
+            )
+            requests.setdefault(key, set()).add(docname)
+    return requests
+
+
+def init_events_backend(app: Sphinx) -> None:
+    """Set the backend to parse events, from the configuration.
+
+    The parsers are selected (and imported) when events are first parsed.
+    """
+    global _BACKEND
+    try:
+        _check_backend(app.config.timeline_events_backend)
+        _BACKEND = app.config.timeline_events_backend
+    except ValueError as exc:
+        LOGGER.warning(f"{exc}, using 'auto'")
+        _BACKEND = "auto"
+    _LOADERS.clear()
+
+
+def get_events_cache(env: BuildEnvironment) -> EventsCache:
+    """Get the events cache of the build environment, creating it if necessary."""
+    if not isinstance(getattr(env, "timeline_events_cache", None), EventsCache):
+        env.timeline_events_cache = EventsCache()  # type: ignore[attr-defined]
+    return env.timeline_events_cache  # type: ignore[attr-defined]
+
+
+def preload_events_cache(
+    app: Sphinx, env: BuildEnvironment, docnames: list[str]
+) -> None:
+    """Before reading documents, load all events files they reference (once)."""
+    cache = get_events_cache(env)
+    cache.reset_stats()
+    if not app.config.timeline_preload_events:
+        return
+    loaded = cache.preload(find_events_files(env, docnames), app.parallel)
+    if loaded:
+        LOGGER.verbose("[timeline] preloaded %d events file(s)", loaded)
+
+
+def purge_events_cache(app: Sphinx, env: BuildEnvironment, docname: str) -> None:
+    """Remove a document, that is being re-read or removed, from the cache users."""
+    get_events_cache(env).purge_doc(docname)
+
+
+def merge_events_cache(
+    app: Sphinx, env: BuildEnvironment, docnames: set[str], other: BuildEnvironment
+) -> None:
+    """Merge the cache of a parallel read process."""
+    get_events_cache(env).merge(get_events_cache(other))
+
+
+def evict_events_cache(app: Sphinx, env: BuildEnvironment) -> None:
+    """Evict stale entries, after all documents have been read."""
+    cache = get_events_cache(env)
+    evicted = cache.evict_stale()
+    LOGGER.verbose(
+        "[timeline] events cache: %d hits, %d misses, %d evicted, %d entries",
+        cache.hits,
+        cache.misses,
+        evicted,
+        len(cache.entries),
+    )
@@ -0,0 +1,256 @@
+"""Caching of the rendered and parsed timeline items.
+
+Each item is keyed by a hash of its template source, its normalised event,
+the document it is parsed in (since e.g. relative cross-references depend on it),
+and the parse state of the document at the directive (see ``parse_context``).
+The cache is stored on the build environment, so that it is shared between directives,
+and persists across incremental builds:
+when a single event of a large timeline changes, only that item is rendered and parsed again.
+"""
+from __future__ import annotations
+
+from collections import OrderedDict
+import hashlib
+import os
+import pickle
+from typing import Any, Iterable
+
+from docutils import nodes
+from sphinx import addnodes
+from sphinx.application import Sphinx
+from sphinx.environment import CONFIG_OK, BuildEnvironment
+from sphinx.util import logging
+
+LOGGER = logging.getLogger(__name__)
+
+_UNREUSABLE = (
+    nodes.pending,
+    nodes.target,
+    nodes.footnote_reference,
+    nodes.citation_reference,
+    nodes.substitution_definition,
+    nodes.substitution_reference,
+    nodes.system_message,
+)
+"""Docutils nodes that are registered with the document (or report warnings) when parsed."""
+_REUSABLE_SPHINX_NODES = (
+    addnodes.pending_xref,
+    addnodes.literal_emphasis,
+    addnodes.literal_strong,
+)
+"""Sphinx nodes created by roles, which have no side effects when parsed."""
+_REGISTERED_ATTRIBUTES = ("ids", "names", "refname", "anonymous")
+"""Node attributes that are registered with the document when parsed."""
+
+
+def is_reusable(children: Iterable[nodes.Node]) -> bool:
+    """Whether parsed nodes can be reused, without parsing their source again.
+
+    This excludes nodes that were registered with the document (e.g. targets or footnotes),
+    or the build environment (e.g. by Sphinx directives), when parsed,
+    or that reported warnings.
+    Processing of the read doctree (transforms and environment collectors) is unaffected.
+    """
+    for child in children:
+        for node in child.findall(nodes.Element):
+            if isinstance(node, _UNREUSABLE):
+                return False
+            if type(node).__module__ != nodes.__name__ and not isinstance(
+                node, _REUSABLE_SPHINX_NODES
+            ):
+                return False
+            if any(node.get(name) for name in _REGISTERED_ATTRIBUTES):
+                return False
+    return True
+
+
+def parse_context(env: BuildEnvironment) -> str:
+    """Get the parse state of the current document, which parsed nodes depend on.
+
+    This is the default role and domain (e.g. set by the ``default-role`` directive),
+    and the reference context (e.g. the current ``py:module``),
+    which is stored on cross-reference nodes.
+    """
+    domain = env.temp_data.get("default_domain")
+    context = [
+        ("default_role", env.temp_data.get("default_role") or ""),
+        ("default_domain", getattr(domain, "name", "")),
+        *sorted(env.ref_context.items()),
+    ]
+    return "\0".join(f"{name}={value}" for name, value in context)
+
+
+class CachedItem:
+    """The rendered text of an item, and its parsed nodes (if reusable)."""
+
+    __slots__ = ("text", "children")
+
+    def __init__(self, text: str, children: bytes | None) -> None:
+        self.text = text
+        self.children = children
+        """The pickled parsed nodes, with line numbers relative to the content.
+
+        Storing the nodes pickled keeps the (pickled) build environment quick to load and save,
+        and unpickling them is quicker than a deep copy.
+        """
+
+    def __getstate__(self) -> dict[str, Any]:
+        return {key: getattr(self, key) for key in self.__slots__}
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        for key, value in state.items():
+            setattr(self, key, value)
+
+
+def _shift_lines(
+    children: Iterable[nodes.Node], offset: int, source: str | None = None
+) -> None:
+    """Shift the line numbers of nodes (in-place), and detach them from their document."""
+    for child in children:
+        for node in child.findall():
+            node._document = None
+            if node.line is not None:
+                node.line += offset
+            if source is not None and node.source is not None:
+                node.source = source
+
+
+class ItemCache:
+    """An LRU cache of rendered and parsed timeline items."""
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self.items: OrderedDict[str, CachedItem] = OrderedDict()
+        # hit/miss counters per process, so that they can be merged after parallel reads
+        self.stats: dict[int, list[int]] = {}
+
+    @property
+    def hits(self) -> int:
+        """The number of items reused, without rendering or parsing."""
+        return sum(hits for hits, _ in self.stats.values())
+
+    @property
+    def misses(self) -> int:
+        """The number of items rendered and/or parsed."""
+        return sum(misses for _, misses in self.stats.values())
+
+    def reset_stats(self) -> None:
+        """Reset the hit/miss counters."""
+        self.stats = {}
+
+    def _count(self, hit: bool) -> None:
+        self.stats.setdefault(os.getpid(), [0, 0])[0 if hit else 1] += 1
+
+    @staticmethod
+    def key(template: str, event: dict[str, Any], docname: str, context: str) -> str:
+        """Compute the key of an item.
+
+        :param template: the source of the item template
+        :param event: the normalised event
+        :param docname: the document the item is parsed in
+        :param context: the parse state of the document (see ``parse_context``)
+        """
+        digest = hashlib.sha256(template.encode("utf8"))
+        digest.update(b"\0" + docname.encode("utf8") + b"\0")
+        digest.update(context.encode("utf8") + b"\0")
+        digest.update(repr(list(event.items())).encode("utf8"))
+        return digest.hexdigest()
+
+    def get(self, key: str) -> CachedItem | None:
+        """Get a cached item, marking it as recently used."""
+        item = self.items.get(key)
+        if item is not None:
+            self.items.move_to_end(key)
+        self._count(item is not None and item.children is not None)
+        return item
+
+    def get_nodes(
+        self, item: CachedItem, content_offset: int, source: str | None
+    ) -> list[nodes.Node]:
+        """Get copies of the parsed nodes of an item, for a directive's content offset."""
+        assert item.children is not None
+        children: list[nodes.Node] = pickle.loads(item.children)
+        _shift_lines(children, content_offset, source)
+        return children
+
+    def store(
+        self,
+        key: str,
+        text: str,
+        children: list[nodes.Node],
+        content_offset: int,
+    ) -> None:
+        """Store an item, with its parsed nodes (if reusable)."""
+        if self.size <= 0:
+            return
+        data = None
+        if is_reusable(children):
+            copies = [child.deepcopy() for child in children]
+            _shift_lines(copies, -content_offset)
+            data = pickle.dumps(copies, pickle.HIGHEST_PROTOCOL)
+        self.items[key] = CachedItem(text, data)
+        self.items.move_to_end(key)
+        self._evict()
+
+    def _evict(self) -> None:
+        while len(self.items) > max(self.size, 0):
+            self.items.popitem(last=False)
+
+    def merge(self, other: ItemCache) -> None:
+        """Merge in the items of another cache (e.g. from a parallel read)."""
+        for key, item in other.items.items():
+            self.items[key] = item
+            self.items.move_to_end(key)
+        self._evict()
+        for pid, counts in other.stats.items():
+            # the counters of this process were copied to the other, when it was forked
+            if pid != os.getpid():
+                self.stats[pid] = counts
+
+
+def get_item_cache(env: BuildEnvironment) -> ItemCache:
+    """Get the item cache of the build environment, creating it if necessary."""
+    if not isinstance(getattr(env, "timeline_items", None), ItemCache):
+        env.timeline_items = ItemCache(  # type: ignore[attr-defined]
+            env.config.timeline_item_cache_size
+        )
+    return env.timeline_items  # type: ignore[attr-defined]
+
+
+def reset_item_cache_stats(
+    app: Sphinx, env: BuildEnvironment, docnames: list[str]
+) -> None:
+    """Before reading documents, reset the hit/miss counters,
+    and apply any change to the cache size.
+
+    The parsed nodes depend on the configuration (e.g. ``default_role``) and extensions,
+    so the cache is cleared when they change.
+    """
+    cache = get_item_cache(env)
+    cache.reset_stats()
+    if env.config_status != CONFIG_OK:
+        cache.items.clear()
+    cache.size = app.config.timeline_item_cache_size
+    cache._evict()
+
+
+def merge_item_cache(
+    app: Sphinx, env: BuildEnvironment, docnames: set[str], other: BuildEnvironment
+) -> None:
+    """Merge the cache of a parallel read process."""
+    get_item_cache(env).merge(get_item_cache(other))
+
+
+def log_item_cache_stats(app: Sphinx, env: BuildEnvironment) -> None:
+    """Log the hit rate of the cache, after all documents have been read."""
+    cache = get_item_cache(env)
+    total = cache.hits + cache.misses
+    if not total:
+        return
+    LOGGER.verbose(
+        "[timeline] item cache: %d hits, %d misses (%.1f%% hit rate), %d entries",
+        cache.hits,
+        cache.misses,
+        100 * cache.hits / total,
+        len(cache.items),
+    )
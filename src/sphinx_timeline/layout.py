@@ -0,0 +1,118 @@
+"""Layout of timeline items in lanes, for the ``lanes`` layout.
+
+Each item is placed along a time axis, by its start,
+with a width spanning its duration (but at least the item width),
+and assigned to the lowest lane that it does not overlap any other item in.
+The lanes are computed when the document is read,
+and written as CSS variables on the items.
+"""
+from __future__ import annotations
+
+import heapq
+from operator import add
+import re
+from typing import Iterable, Tuple
+
+from docutils import nodes
+
+LAYOUTS = ("default", "lanes")
+"""The choices of timeline layout."""
+DEFAULT_DAY_WIDTH = 10.0
+"""The default width of one day, in pixels."""
+DEFAULT_ITEM_WIDTH = 280.0
+"""The default (minimum) width of an item, in pixels, matching ``--tl-item-width``."""
+
+_DAY_MICROS = 86_400_000_000
+RE_PIXELS = re.compile(r"^\s*(\d+(?:\.\d*)?|\.\d+)\s*(?:px)?\s*$")
+
+
+def pixels(argument: str | None) -> float:
+    """Convert a positive number of pixels, e.g. ``10`` or ``10.5px``."""
+    match = RE_PIXELS.match(argument or "")
+    if not match or not float(match.group(1)):
+        raise ValueError(f"expected a positive number of pixels, got {argument!r}")
+    return float(match.group(1))
+
+
+LanePosition = Tuple[int, float, float, float]
+"""The lane of an item, and its offset from the start of the earliest item,
+its width and the width of its duration, in pixels.
+"""
+
+
+def assign_lanes(intervals: Iterable[tuple[float, float]]) -> list[int]:
+    """Assign each interval to the lowest lane, without overlapping any other interval.
+
+    This is a sweep over the intervals, sorted by start,
+    with a heap of the ends of the active lanes, and a heap of the free lanes,
+    so it is ``O(n log n)``.
+    Intervals are half-open, so an interval can start where another ends.
+
+    :param intervals: ``(start, end)`` of each interval
+    :returns: the lane of each interval (in the given order)
+    """
+    heappop, heappush = heapq.heappop, heapq.heappush
+    intervals = list(intervals)
+    lanes = [0] * len(intervals)
+    active: list[tuple[float, int]] = []
+    free: list[int] = []
+    # items are usually already sorted by start (or reversed), which sorts in linear time
+    for idx in sorted(range(len(intervals)), key=intervals.__getitem__):
+        start, end = intervals[idx]
+        while active and active[0][0] <= start:
+            heappush(free, heappop(active)[1])
+        lane = heappop(free) if free else len(active)
+        heappush(active, (end, lane))
+        lanes[idx] = lane
+    return lanes
+
+
+def lane_positions(
+    spans: list[tuple[int, int]], day_width: float, min_width: float
+) -> list[LanePosition]:
+    """Compute the positions of items in lanes.
+
+    :param spans: ``(start, end)`` of each item, as UTC epoch microseconds
+    :param day_width: the width of one day, in pixels
+    :param min_width: the minimum width of an item, in pixels
+    """
+    if not spans:
+        return []
+    origin = min(start for start, _ in spans)
+    scale = day_width / _DAY_MICROS
+    lefts = [(start - origin) * scale for start, _ in spans]
+    durations = [(end - start) * scale if end > start else 0.0 for start, end in spans]
+    widths = [span if span > min_width else min_width for span in durations]
+    lanes = assign_lanes(zip(lefts, map(add, lefts, widths)))
+    return list(zip(lanes, lefts, widths, durations))
+
+
+def apply_lanes(
+    item_nodes: list[nodes.list_item],
+    list_node: nodes.Element,
+    container: nodes.Element,
+    day_width: float,
+    min_width: float,
+) -> None:
+    """Position the items of a timeline in lanes.
+
+    The item divs must have ``start`` and ``end`` attributes (UTC epoch microseconds).
+    """
+    items = [item_node[0] for item_node in item_nodes]
+    positions = lane_positions(
+        [(item["start"], item["end"]) for item in items], day_width, min_width
+    )
+    for item, (lane, left, width, span) in zip(items, positions):
+        item["lane"] = lane
+        item.add_style("--tl-lane", str(lane))
+        item.add_style("--tl-left", f"{left:.6g}px")
+        item.add_style("--tl-width", f"{width:.6g}px")
+        item.add_style("--tl-span", f"{span:.6g}px")
+    list_node["classes"].append("tl-lanes")
+    container.add_style(
+        "--tl-lanes", str(max((lane for lane, *_ in positions), default=-1) + 1)
+    )
+    container.add_style(
+        "--tl-lanes-width",
+        f"{max((left + width for _, left, width, _ in positions), default=0):.6g}px",
+    )
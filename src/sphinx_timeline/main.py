@@ -1,33 +1,141 @@
 from __future__ import annotations
 
-import csv
+from datetime import datetime, timezone
+from functools import lru_cache
 import hashlib
 from importlib import resources
 from io import StringIO
-import json
 from pathlib import Path
 import re
-from typing import Any, Literal, TextIO
+from typing import TYPE_CHECKING, Any
 
 from docutils import nodes
-from docutils.parsers.rst import directives
+from docutils.parsers import Parser as DocutilsParser
+from docutils.parsers.rst import Parser, directives
 from docutils.statemachine import StringList
-import jinja2
+import sphinx
 from sphinx.application import Sphinx
-from sphinx.util.docutils import SphinxDirective
-import yaml
+from sphinx.environment import BuildEnvironment
+from sphinx.transforms.post_transforms import SphinxPostTransform
+from sphinx.util import get_filetype, logging
+from sphinx.util.docutils import SphinxDirective, new_document, sphinx_domains
 
 from sphinx_timeline import dtime
 from sphinx_timeline import static as static_module
+from sphinx_timeline.collect import (
+    get_collected_events,
+    merge_collected_events,
+    purge_collected_events,
+    tags_option,
+    update_collectors,
+)
+from sphinx_timeline.dependencies import (
+    get_outdated,
+    merge_dependencies,
+    note_content_dependency,
+    purge_dependencies,
+)
+from sphinx_timeline.events import (
+    EVENTS_FORMATS,
+    RANGE_OPTIONS,
+    cache_selection,
+    evict_events_cache,
+    get_events_cache,
+    init_events_backend,
+    load_events,
+    merge_events_cache,
+    preload_events_cache,
+    purge_events_cache,
+)
+from sphinx_timeline.events import read_events  # noqa: F401
+from sphinx_timeline.items import (
+    get_item_cache,
+    log_item_cache_stats,
+    merge_item_cache,
+    parse_context,
+    reset_item_cache_stats,
+)
+from sphinx_timeline.layout import (
+    DEFAULT_DAY_WIDTH,
+    DEFAULT_ITEM_WIDTH,
+    LAYOUTS,
+    apply_lanes,
+    pixels,
+)
+from sphinx_timeline.pages import (
+    MergeTimelinePages,
+    TimelinePageNav,
+    collect_pages,
+    merge_pages,
+    page_names,
+    purge_pages,
+    store_page,
+    visit_tl_page_nav,
+)
+from sphinx_timeline.prerender import (
+    TimelineHTML,
+    can_prerender,
+    prerender,
+    visit_tl_html,
+)
+from sphinx_timeline.profiling import (
+    DirectiveProfile,
+    merge_profiles,
+    phase,
+    profile_directive,
+    purge_profiles,
+    write_profile_report,
+)
+from sphinx_timeline.store import EventStore, utc_micros
+from sphinx_timeline.templates import (
+    file_template_source,
+    get_template_cache,
+    init_template_cache,
+)
+
+if TYPE_CHECKING:
+    import jinja2
+
+LOGGER = logging.getLogger(__name__)
 
 
 def setup(app: Sphinx) -> None:
     """Setup the extension."""
     from sphinx_timeline import __version__
 
+    app.add_config_value("timeline_template_cache_size", 400, "")
+    app.add_config_value("timeline_parse_chunk_size", 1, "")
+    app.add_config_value("timeline_preload_events", True, "")
+    app.add_config_value("timeline_profile", False, "env")
+    app.add_config_value("timeline_events_backend", "auto", "")
+    app.add_config_value("timeline_item_cache_size", 10000, "")
+    app.connect("builder-inited", init_template_cache)
+    app.connect("builder-inited", init_events_backend)
     app.connect("builder-inited", add_html_assets)
     app.connect("html-page-context", load_html_assets)
+    app.connect("env-before-read-docs", preload_events_cache)
+    app.connect("env-purge-doc", purge_events_cache)
+    app.connect("env-merge-info", merge_events_cache)
+    app.connect("env-updated", evict_events_cache)
+    app.connect("env-get-outdated", get_outdated)
+    app.connect("env-purge-doc", purge_dependencies)
+    app.connect("env-merge-info", merge_dependencies)
+    app.connect("env-purge-doc", purge_profiles)
+    app.connect("env-merge-info", merge_profiles)
+    app.connect("build-finished", write_profile_report)
+    app.connect("env-purge-doc", purge_pages)
+    app.connect("env-merge-info", merge_pages)
+    app.connect("html-collect-pages", collect_pages)
+    app.connect("env-purge-doc", purge_collected_events)
+    app.connect("env-merge-info", merge_collected_events)
+    app.connect("env-updated", update_collectors)
+    app.connect("env-before-read-docs", reset_item_cache_stats)
+    app.connect("env-merge-info", merge_item_cache)
+    app.connect("env-updated", log_item_cache_stats)
     app.add_directive("timeline", TimelineDirective)
+    app.add_directive("timeline-event", TimelineEventDirective)
+    app.add_post_transform(CollectTimelines)
+    app.add_post_transform(MergeTimelinePages)
     app.add_node(
         TimelineDiv,
         html=(visit_tl_div, depart_tl_div),
@@ -36,6 +144,23 @@ def setup(app: Sphinx) -> None:
         man=(visit_depart_null, visit_depart_null),
         texinfo=(visit_depart_null, visit_depart_null),
     )
+    app.add_node(TimelineCollect)
+    app.add_node(
+        TimelineHTML,
+        html=(visit_tl_html, None),
+        latex=(visit_depart_null, visit_depart_null),
+        text=(visit_depart_null, visit_depart_null),
+        man=(visit_depart_null, visit_depart_null),
+        texinfo=(visit_depart_null, visit_depart_null),
+    )
+    app.add_node(
+        TimelinePageNav,
+        html=(visit_tl_page_nav, None),
+        latex=(visit_skip_node, None),
+        text=(visit_skip_node, None),
+        man=(visit_skip_node, None),
+        texinfo=(visit_skip_node, None),
+    )
 
     return {
         "version": __version__,
@@ -44,46 +169,59 @@ def setup(app: Sphinx) -> None:
     }
 
 
-def add_html_assets(app: Sphinx) -> None:
-    """Add the HTML assets to the build directory."""
-    if (not app.builder) or app.builder.format != "html":
-        return
-    # setup up new static path in output dir
-    static_path = (Path(app.outdir) / "_sphinx_timeline_static").absolute()
-    static_path.mkdir(exist_ok=True)
-    for path in static_path.glob("**/*"):
-        path.unlink()
-    app.config.html_static_path.append(str(static_path))
+@lru_cache(maxsize=None)
+def get_html_assets() -> dict[str, str]:
+    """Get the HTML assets, as a mapping of hashed file name to content.
+
+    This is computed once per process.
+    """
+    assets = {}
     for resource in resources.contents(static_module):
         if not resource.endswith(".css") and not resource.endswith(".js"):
             continue
         # Read the content and hash it
         content = resources.read_text(static_module, resource)
         hash = hashlib.md5(content.encode("utf8")).hexdigest()
-        # Write the file
         name, ext = resource.split(".", maxsplit=1)
-        write_path = static_path / f"{name}.{hash}.{ext}"
-        write_path.write_text(content, encoding="utf8")
+        assets[f"{name}.{hash}.{ext}"] = content
+    return assets
 
 
-def load_html_assets(app: Sphinx, pagename: str, *args, **kwargs) -> None:
+def add_html_assets(app: Sphinx) -> None:
+    """Add the HTML assets to the build directory."""
+    if (not app.builder) or app.builder.format != "html":
+        return
+    assets = get_html_assets()
+    app.timeline_html_assets = list(assets)  # type: ignore[attr-defined]
+    # setup up static path in output dir
+    static_path = (Path(app.outdir) / "_sphinx_timeline_static").absolute()
+    static_path.mkdir(parents=True, exist_ok=True)
+    app.config.html_static_path.append(str(static_path))
+    # remove outdated files, and only write files that do not already exist
+    for path in static_path.glob("**/*"):
+        if path.is_file() and path.name not in assets:
+            path.unlink()
+    for write_name, content in assets.items():
+        write_path = static_path / write_name
+        if not write_path.exists():
+            write_path.write_text(content, encoding="utf8")
+
+
+def load_html_assets(
+    app: Sphinx, pagename: str, templatename: str, context: dict, *args, **kwargs
+) -> None:
     """Ensure the HTML assets are loaded in the page, if necessary."""
     if (not app.builder) or app.builder.format != "html":
         return
-    if (not app.env) or not app.env.metadata.get(pagename, {}).get("timeline", False):
+    if not context.get("timeline_page", False) and (
+        (not app.env) or not app.env.metadata.get(pagename, {}).get("timeline", False)
+    ):
         return
-    for resource in resources.contents(static_module):
-        if not resource.endswith(".css") and not resource.endswith(".js"):
-            continue
-        # Read the content and hash it
-        content = resources.read_text(static_module, resource)
-        hash = hashlib.md5(content.encode("utf8")).hexdigest()
+    for write_name in getattr(app, "timeline_html_assets", ()):
         # add the file to the context
-        name, ext = resource.split(".", maxsplit=1)
-        write_name = f"{name}.{hash}.{ext}"
-        if ext == "css":
+        if write_name.endswith(".css"):
             app.add_css_file(write_name)
-        if ext == "js":
+        if write_name.endswith(".js"):
             app.add_js_file(write_name)
 
 
@@ -100,6 +238,11 @@ def visit_depart_null(self, node: nodes.Element) -> None:
     """visit/depart passthrough"""
 
 
+def visit_skip_node(self, node: nodes.Element) -> None:
+    """visit skip node and its children"""
+    raise nodes.SkipNode
+
+
 def visit_tl_div(self, node: nodes.Node):
     """visit tl_div"""
     attrs = {}
@@ -109,17 +252,102 @@ def visit_tl_div(self, node: nodes.Node):
         )
     if node.get("dt"):
         attrs["data-dt"] = str(node["dt"])
+    if node.get("lane") is not None:
+        attrs["data-lane"] = str(node["lane"])
+    if node.get("virtual"):
+        # the item is only mounted when scrolled into view
+        self.body.append('<template class="tl-virtual">')
     self.body.append(self.starttag(node, "div", CLASS="docutils", **attrs))
 
 
 def depart_tl_div(self, node: nodes.Node):
     """depart tl_div"""
     self.body.append("</div>\n")
+    if node.get("virtual"):
+        self.body.append("</template>\n")
+
+
+class TimelineCollect(nodes.General, nodes.Element):
+    """A placeholder for a timeline of collected events,
+    replaced when the document is written.
+    """
 
 
 RE_BREAKLINE = re.compile(r"^\s*-{3,}\s*$")
 
 
+def render_items(template: jinja2.Template, items: list[dict[str, Any]]) -> list[str]:
+    """Render the template for each item."""
+    return [
+        template.render(
+            e=item,
+            dt=dtime.DtRangeStr(item["start"]),
+            duration=dtime.fmt_delta(item.get("duration")),
+            dtrange=dtime.DtRangeStr(item["start"], item.get("duration")),
+        )
+        for item in items
+    ]
+
+
+def create_item_nodes(
+    items: list[dict[str, Any]],
+    parsed: list[list[nodes.Node]],
+    options: dict[str, Any],
+) -> list[nodes.list_item]:
+    """Create the timeline list items, from the items and their parsed content."""
+    item_nodes = []
+    for item, children in zip(items, parsed):
+        item_node = nodes.list_item(
+            classes=(["timeline"] + options.get("class-item", []))
+        )
+        item_nodes.append(item_node)
+        item_container = TimelineDiv(classes=["tl-item"], dt=item["start"].isoformat())
+        if options.get("render") == "virtual":
+            item_container["virtual"] = True
+        if options.get("layout") == "lanes":
+            # the span of the item, for the lanes to be computed per timeline (page)
+            item_container["start"] = utc_micros(item["start"])
+            item_container["end"] = utc_micros(
+                item["start"] + item["duration"]
+                if item.get("duration")
+                else item["start"]
+            )
+        item_content = TimelineDiv(classes=["tl-item-content"])
+        item_container.append(item_content)
+        item_content.extend(children)
+        item_node.append(item_container)
+    return item_nodes
+
+
+def create_container(
+    item_nodes: list[nodes.list_item], options: dict[str, Any]
+) -> TimelineDiv:
+    """Create the timeline container, for a list of items."""
+    container = TimelineDiv()
+    if "height" in options:
+        container.add_style("--tl-height", options["height"])
+    if "width-item" in options:
+        container.add_style("--tl-item-width", options["width-item"])
+
+    list_node = nodes.enumerated_list(
+        classes=[f"timeline-{options.get('style', 'default')}"]
+        + options.get("class", [])
+    )
+    list_node.extend(item_nodes)
+    container.append(list_node)
+    if options.get("layout") == "lanes":
+        apply_lanes(
+            item_nodes,
+            list_node,
+            container,
+            options.get("day-width", DEFAULT_DAY_WIDTH),
+            pixels(options["width-item"])
+            if "width-item" in options
+            else DEFAULT_ITEM_WIDTH,
+        )
+    return container
+
+
 class TimelineDirective(SphinxDirective):
     """A sphinx directive to create timelines."""
 
@@ -129,167 +357,487 @@ class TimelineDirective(SphinxDirective):
     option_spec = {
         "events": directives.path,
         "template": directives.path,
-        "events-format": lambda val: directives.choice(val, ["yaml", "json", "csv"]),
+        "events-format": lambda val: directives.choice(val, EVENTS_FORMATS),
         "max-items": directives.nonnegative_int,
+        "from": directives.unchanged_required,
+        "to": directives.unchanged_required,
+        "since": directives.unchanged_required,
+        "until": directives.unchanged_required,
+        "page-size": directives.nonnegative_int,
         "reversed": directives.flag,
         "height": directives.length_or_unitless,
         "width-item": directives.length_or_percentage_or_unitless,
         "style": lambda val: directives.choice(val, ["default", "none"]),
+        "render": lambda val: directives.choice(val, ["default", "virtual"]),
+        "layout": lambda val: directives.choice(val, LAYOUTS),
+        "day-width": pixels,
+        "prerender": directives.flag,
         "class": directives.class_option,
         "class-item": directives.class_option,
+        "collect": tags_option,
     }
 
     def run(self) -> list[nodes.Element]:
         """Run the directive."""
-        data: list[dict[str, Any]]
-        template_lines: list[str]
-
-        # get data
-        if "events" in self.options:
-            input_file = self.options["events"]
-            # get file path relative to the document
-            _, abs_path = self.env.relfn2path(input_file, self.env.docname)
-            if not Path(abs_path).exists():
-                raise self.error(f"'data' path does not exist: {abs_path}")
-            # read file
-            with Path(abs_path).open("r", encoding="utf8") as handle:
+        if self.options.get("layout") == "lanes":
+            if self.options.get("render") == "virtual":
+                raise self.error(
+                    "'layout: lanes' and 'render: virtual' cannot be used together"
+                )
+            if "width-item" in self.options:
                 try:
-                    data = read_events(
-                        handle, self.options.get("events-format", "yaml")
+                    pixels(self.options["width-item"])
+                except ValueError:
+                    raise self.error(
+                        "'width-item' must be in pixels, for 'layout: lanes'"
                     )
-                except Exception as exc:
-                    raise self.error(f"Error parsing data: {exc}")
-            # add input file to dependencies
-            self.env.note_dependency(input_file)
+        if "collect" in self.options:
+            return self.run_collect()
+        with profile_directive(
+            self.env, self.lineno, self.options.get("events", "<inline>")
+        ) as profile:
+            return self.run_timeline(profile)
+
+    def run_collect(self) -> list[nodes.Element]:
+        """Create a placeholder for a timeline of the events collected from all documents,
+        which is filled in when the document is written.
+        """
+        import jinja2
+
+        for name in ("events", "page-size", "prerender"):
+            if name in self.options:
+                raise self.error(
+                    f"'collect' and '{name}' options cannot be used together"
+                )
+        try:
+            start, end = self.get_range()
+        except ValueError as exc:
+            raise self.error(str(exc))
 
-            template_lines = list(self.content)
+        if "template" in self.options:
+            _, abs_path = self.env.relfn2path(self.options["template"])
+            if not Path(abs_path).exists():
+                raise self.error(f"'template' path does not exist: {abs_path}")
+            # the same source as for a template file of a normal timeline
+            template = file_template_source(Path(abs_path).read_text(encoding="utf8"))
+            note_content_dependency(self.env, abs_path)
         else:
-            # split lines by first occurrence of line break
-            data_lines = []
-            template_lines = []
-            in_template = False
-            for line in self.content:
-                if not in_template and RE_BREAKLINE.match(line):
-                    in_template = True
-                elif in_template:
-                    template_lines.append(line)
-                else:
-                    data_lines.append(line)
+            template = "\n".join(self.content)
+        # check the template is valid, before the document is written
+        try:
+            get_template_cache(self.env).from_string(template)
+            includes = get_template_cache(self.env).includes(template)
+        except ValueError as exc:
+            raise self.error(str(exc))
+        except jinja2.TemplateError as exc:
+            raise self.error(f"Error parsing template: {exc}")
+        for path in includes or {}:
+            note_content_dependency(self.env, path)
+
+        node = TimelineCollect(
+            tags=self.options["collect"],
+            template=template,
+            start=start,
+            end=end,
+            options={
+                key: value
+                for key, value in self.options.items()
+                if key not in ("collect", "template", *RANGE_OPTIONS)
+            },
+        )
+        self.set_source_info(node)
+        get_collected_events(self.env).add_collector(
+            self.env.docname, self.options["collect"]
+        )
+        self.env.metadata[self.env.docname]["timeline"] = True
+        return [node]
+
+    def run_timeline(self, profile: DirectiveProfile | None) -> list[nodes.Element]:
+        """Run the directive, recording to the profile, if given."""
+        import jinja2
 
+        data: EventStore
+        template_lines: list[str]
+        fmt = self.options.get("events-format", "yaml")
+        limit = self.options.get("max-items") or None
+        newest_first = "reversed" not in self.options
+        try:
+            start, end = self.get_range()
+        except ValueError as exc:
+            raise self.error(str(exc))
+        # for a range, the limit is applied after filtering
+        ranged = start is not None or end is not None
+
+        # get data
+        with phase("read"):
+            if "events" in self.options:
+                input_file = self.options["events"]
+                # get file path relative to the document
+                _, abs_path = self.env.relfn2path(input_file, self.env.docname)
+                if not Path(abs_path).exists():
+                    raise self.error(f"'data' path does not exist: {abs_path}")
+                # read file, or get it from the cache if unchanged
+                # (streamable formats only hold the selected events in memory)
                 try:
-                    data = read_events(
-                        StringIO("\n".join(data_lines)),
-                        self.options.get("events-format", "yaml"),
+                    data = get_events_cache(self.env).get(
+                        abs_path,
+                        fmt,
+                        self.env.docname,
+                        cache_selection(fmt, None if ranged else limit, newest_first),
                     )
-                except Exception as exc:
-                    raise self.error(f"Error parsing data: {exc}")
+                except ValueError as exc:
+                    raise self.error(str(exc))
+                # add input file to dependencies
+                note_content_dependency(self.env, abs_path)
+
+                template_lines = list(self.content)
+            else:
+                # split lines by first occurrence of line break,
+                # then parse the data block in a single pass
+                lines = list(self.content)
+                split_idx = next(
+                    (idx for idx, line in enumerate(lines) if RE_BREAKLINE.match(line)),
+                    len(lines),
+                )
+                data_lines = lines[:split_idx]
+                template_lines = lines[split_idx + 1 :]
+                try:
+                    data = EventStore.from_events(
+                        load_events(StringIO("\n".join(data_lines)), fmt)
+                    )
+                except ValueError as exc:
+                    raise self.error(str(exc))
 
-        if "template" in self.options:
-            # get template from file
-            input_file = self.options["template"]
-            # get file path relative to the document
-            _, abs_path = self.env.relfn2path(input_file)
-            if not Path(abs_path).exists():
-                raise self.error(f"'template' path does not exist: {abs_path}")
-            # read file
-            with Path(abs_path).open() as handle:
-                template_lines = handle.readlines()
-            # add input file to dependencies
-            self.env.note_dependency(input_file)
-
-        # validate data
-        if not isinstance(data, list):
-            raise self.error("Data must be a list")
-        if not data:
-            raise self.error("Data must not be empty")
-
-        for idx, item in enumerate(data):
-            if not isinstance(item, dict):
-                raise self.error(f"item {idx}: each data item must be a dictionary")
-
-            if "start" not in item:
-                raise self.error(f"item {idx}: each data item must contain 'start' key")
+        # get compiled template
+        with phase("render"):
             try:
-                item["start"] = dtime.to_datetime(item["start"])
-            except Exception as exc:
-                raise self.error(
-                    f"item {idx}: error parsing 'start' value: {exc}"
-                ) from exc
-
-            if "duration" in item:
-                try:
-                    item["duration"] = dtime.parse_duration(item["duration"])
-                except Exception as exc:
-                    raise self.error(
-                        f"item {idx}: error parsing 'duration' value: {exc}"
-                    ) from exc
-
-        # validate template
-        if not [line for line in template_lines if line.strip()]:
-            raise self.error("Template cannot be empty")
-
-        env = jinja2.Environment()
-        # env.filters["fdtime"] = _format_datetime
-        template = env.from_string("\n".join(template_lines))
-
-        container = TimelineDiv()
-        if "height" in self.options:
-            container.add_style("--tl-height", self.options["height"])
-        if "width-item" in self.options:
-            container.add_style("--tl-item-width", self.options["width-item"])
-
-        list_node = nodes.enumerated_list(
-            classes=[f"timeline-{self.options.get('style', 'default')}"]
-            + self.options.get("class", [])
+                if "template" in self.options:
+                    # get template from file
+                    input_file = self.options["template"]
+                    # get file path relative to the document
+                    _, abs_path = self.env.relfn2path(input_file)
+                    if not Path(abs_path).exists():
+                        raise self.error(f"'template' path does not exist: {abs_path}")
+                    template = get_template_cache(self.env).from_file(abs_path)
+                    template_source = Path(abs_path).read_text(encoding="utf8")
+                    # add input file to dependencies
+                    note_content_dependency(self.env, abs_path)
+                else:
+                    template_source = "\n".join(template_lines)
+                    template = get_template_cache(self.env).from_string(template_source)
+                includes = get_template_cache(self.env).includes(template_source)
+            except ValueError as exc:
+                raise self.error(str(exc))
+            except jinja2.TemplateError as exc:
+                raise self.error(f"Error parsing template: {exc}")
+            # the parsed items also depend on the included templates
+            for path, source in (includes or {}).items():
+                note_content_dependency(self.env, path)
+                template_source += f"\0{path}\0{source}"
+
+        with phase("sort"):
+            items = data.select(limit, newest_first, start, end)
+        if profile is not None:
+            profile.events = len(data)
+            profile.items = len(items)
+
+        parsed = self.render_and_parse(
+            template, None if includes is None else template_source, items
         )
-        self.set_source_info(list_node)
-        container.append(list_node)
 
-        for idx, item in enumerate(
-            sorted(
-                data, key=lambda x: x["start"], reverse=("reversed" not in self.options)
-            )
-        ):
-            if self.options.get("max-items") and idx >= self.options["max-items"]:
-                break
-            rendered = template.render(
-                e=item,
-                dt=dtime.DtRangeStr(item["start"]),
-                duration=dtime.fmt_delta(item.get("duration")),
-                dtrange=dtime.DtRangeStr(item["start"], item.get("duration")),
-            )
-            item_node = nodes.list_item(
-                classes=(["timeline"] + self.options.get("class-item", []))
-            )
+        item_nodes = create_item_nodes(items, parsed, self.options)
+        for item_node in item_nodes:
             self.set_source_info(item_node)
-            list_node.append(item_node)
-            item_container = TimelineDiv(
-                classes=["tl-item"], dt=item["start"].isoformat()
+
+        self.env.metadata[self.env.docname]["timeline"] = True
+
+        page_size = self.options.get("page-size") or len(item_nodes) or 1
+        if len(item_nodes) <= page_size:
+            return [self.create_timeline(item_nodes)]
+
+        # only the first page is part of this document,
+        # the others are written as separate HTML pages
+        pages = [
+            item_nodes[start : start + page_size]
+            for start in range(0, len(item_nodes), page_size)
+        ]
+        names = page_names(
+            self.env.docname, self.env.new_serialno("timeline-pages"), len(pages)
+        )
+        results: list[list[nodes.Element]] = []
+        for num, page_items in enumerate(pages):
+            nav = TimelinePageNav(page=names[num], number=num + 1, total=len(pages))
+            if num:
+                nav["prev"] = names[num - 1]
+            if num + 1 < len(pages):
+                nav["next"] = names[num + 1]
+            results.append([self.create_timeline(page_items), nav])
+        for name, content in zip(names[1:], results[1:]):
+            store_page(self.env, name, content)
+        return results[0]
+
+    def get_range(self) -> tuple[datetime | None, datetime | None]:
+        """Get the range of event starts to select, from the options.
+
+        Relative times are computed when the document is read,
+        so the document is marked to be re-read on every build.
+
+        :raises ValueError: if an option is invalid
+        """
+        for absolute, relative in (("from", "since"), ("to", "until")):
+            if absolute in self.options and relative in self.options:
+                raise ValueError(
+                    f"'{absolute}' and '{relative}' options cannot be used together"
+                )
+        now = datetime.now(timezone.utc)
+        start = end = None
+        if "from" in self.options:
+            start = dtime.to_datetime(self.options["from"])
+        if "since" in self.options:
+            start = dtime.relative_datetime(self.options["since"], now, past=True)
+        if "to" in self.options:
+            end = dtime.to_datetime(self.options["to"])
+        if "until" in self.options:
+            end = dtime.relative_datetime(self.options["until"], now, past=False)
+        if "since" in self.options or "until" in self.options:
+            self.env.note_reread()
+        return start, end
+
+    def create_timeline(self, item_nodes: list[nodes.list_item]) -> nodes.Element:
+        """Create the timeline container, pre-rendering it to HTML if requested."""
+        container = self.create_container(item_nodes)
+        if "prerender" not in self.options:
+            return container
+        if not can_prerender(container):
+            LOGGER.verbose(
+                "[timeline] not pre-rendering: items contain content requiring Sphinx",
+                location=(self.env.docname, self.lineno),
+            )
+            return container
+        return prerender(container, container[0])
+
+    def create_container(self, item_nodes: list[nodes.list_item]) -> TimelineDiv:
+        """Create the timeline container, for a list of items."""
+        container = create_container(item_nodes, self.options)
+        self.set_source_info(container[0])
+        return container
+
+    def render_and_parse(
+        self,
+        template: jinja2.Template,
+        template_source: str | None,
+        items: list[dict[str, Any]],
+    ) -> list[list[nodes.Node]]:
+        """Render and parse the items, reusing the cached nodes of unchanged items.
+
+        Items whose parsed nodes cannot be reused (see ``is_reusable``)
+        reuse their rendered text, and are parsed again.
+
+        :param template_source: the source of the template (and its included templates),
+            or ``None`` if it cannot be known before rendering, so items are not cached
+        """
+        cache = get_item_cache(self.env)
+        source = self.state.document.current_source
+        parsed: list[list[nodes.Node]] = [[] for _ in items]
+        texts: dict[int, str] = {}
+        with phase("render"):
+            keys: list[str | None] = [None] * len(items)
+            if template_source is not None:
+                context = parse_context(self.env)
+                keys = [
+                    cache.key(template_source, item, self.env.docname, context)
+                    for item in items
+                ]
+            to_render = []
+            for idx, key in enumerate(keys):
+                cached = None if key is None else cache.get(key)
+                if cached is None:
+                    to_render.append(idx)
+                elif cached.children is None:
+                    texts[idx] = cached.text
+                else:
+                    parsed[idx] = cache.get_nodes(cached, self.content_offset, source)
+            rendered = render_items(template, [items[idx] for idx in to_render])
+            texts.update(zip(to_render, rendered))
+
+        with phase("parse"):
+            to_parse = sorted(texts)
+            for idx, children in zip(
+                to_parse, self.parse_items([texts[idx] for idx in to_parse])
+            ):
+                parsed[idx] = children
+                key = keys[idx]
+                if key is not None:
+                    cache.store(key, texts[idx], children, self.content_offset)
+        return parsed
+
+    def parse_items(self, rendered: list[str]) -> list[list[nodes.Node]]:
+        """Parse the rendered items, with one nested parse per chunk of items.
+
+        The items of a chunk are separated by a unique marker paragraph,
+        and the parsed nodes are then split back into items on these markers.
+        Each line keeps its offset within the item, for warning reporting.
+        If the markers cannot all be found (e.g. if an item contains an unclosed block),
+        then the items of the chunk are parsed separately.
+        """
+        chunk_size = self.config.timeline_parse_chunk_size
+        if chunk_size <= 1:
+            return self.parse_items_separately(rendered)
+
+        from uuid import uuid4
+
+        source = self.state.document.current_source
+        marker = f"sphinx-timeline-item-{uuid4().hex}"
+        items: list[list[nodes.Node]] = []
+        for start in range(0, len(rendered), chunk_size):
+            chunk = rendered[start : start + chunk_size]
+
+            lines: list[str] = []
+            line_items: list[tuple[str | None, int]] = []
+            for idx, text in enumerate(chunk):
+                if idx:
+                    lines.extend(("", marker, ""))
+                    line_items.extend([(source, 0)] * 3)
+                for offset, line in enumerate(text.splitlines()):
+                    lines.append(line)
+                    line_items.append((source, offset))
+
+            parent = nodes.Element()
+            self.state.nested_parse(
+                StringList(lines, items=line_items), self.content_offset, parent
             )
-            item_content = TimelineDiv(classes=["tl-item-content"])
-            item_container.append(item_content)
-            # item_container.append(nodes.Text(rendered))
+
+            chunk_items: list[list[nodes.Node]] = [[]]
+            for child in parent.children:
+                if isinstance(child, nodes.paragraph) and child.astext() == marker:
+                    chunk_items.append([])
+                else:
+                    chunk_items[-1].append(child)
+            if len(chunk_items) != len(chunk):
+                chunk_items = self.parse_items_separately(chunk)
+            items.extend(chunk_items)
+
+        return items
+
+    def parse_items_separately(self, rendered: list[str]) -> list[list[nodes.Node]]:
+        """Parse the rendered items, with a nested parse per item."""
+        items = []
+        for text in rendered:
+            parent = nodes.Element()
             self.state.nested_parse(
-                StringList(rendered.splitlines(), self.state.document.current_source),
+                StringList(text.splitlines(), self.state.document.current_source),
                 self.content_offset,
-                item_content,
+                parent,
             )
-            item_node.append(item_container)
+            items.append(parent.children[:])
+        return items
 
-        self.env.metadata[self.env.docname]["timeline"] = True
 
-        return [container]
+class TimelineEventDirective(SphinxDirective):
+    """A sphinx directive to record an event, for timelines collecting events.
 
+    The content is not rendered, but is available to templates as ``e.content``.
+    """
+
+    has_content = True
+    required_arguments = 0
+    optional_arguments = 1
+    final_argument_whitespace = True
+    option_spec = {
+        "start": directives.unchanged_required,
+        "duration": directives.unchanged_required,
+        "tags": tags_option,
+    }
 
-def read_events(
-    stream: TextIO, fmt: Literal["yaml", "json", "csv"]
-) -> list[dict[str, Any]]:
-    """Read events from a stream."""
-    if fmt == "yaml":
-        return yaml.safe_load(stream)
-    if fmt == "json":
-        return json.load(stream)
-    if fmt == "csv":
-        return list(csv.DictReader(stream))
+    def run(self) -> list[nodes.Element]:
+        """Run the directive."""
+        if "start" not in self.options:
+            raise self.error("'start' option is required")
+        event: dict[str, Any] = {"name": self.arguments[0] if self.arguments else ""}
+        try:
+            event["start"] = dtime.to_datetime(self.options["start"])
+        except Exception as exc:
+            raise self.error(f"error parsing 'start' value: {exc}")
+        if "duration" in self.options:
+            try:
+                event["duration"] = dtime.parse_duration(self.options["duration"])
+            except Exception as exc:
+                raise self.error(f"error parsing 'duration' value: {exc}")
+        refid = f"timeline-event-{self.env.new_serialno('timeline-event')}"
+        event.update(
+            tags=self.options.get("tags", []),
+            content="\n".join(self.content),
+            docname=self.env.docname,
+            refid=refid,
+        )
+        get_collected_events(self.env).add(self.env.docname, event)
 
-    raise ValueError(f"Unknown format: {fmt}")
+        target = nodes.target("", "", ids=[refid])
+        self.set_source_info(target)
+        return [target]
+
+
+def source_parser(document: nodes.document, env: BuildEnvironment) -> DocutilsParser:
+    """Create a parser for the source format of a document (e.g. reStructuredText or MyST).
+
+    For reStructuredText, the docutils parser is used,
+    since the Sphinx parser would also add the ``rst_prolog`` and ``rst_epilog``.
+    """
+    filetype = get_filetype(env.config.source_suffix, document["source"])
+    if filetype == "restructuredtext":
+        return Parser()
+    if sphinx.version_info < (9,):
+        return env.app.registry.create_source_parser(env.app, filetype)  # type: ignore
+    return env._registry.create_source_parser(filetype, config=env.config, env=env)
+
+
+def parse_source(
+    text: str, document: nodes.document, env: BuildEnvironment, parser: DocutilsParser
+) -> list[nodes.Node]:
+    """Parse text, outside of a directive (e.g. in a transform)."""
+    subdocument = new_document(document["source"], document.settings)
+    with sphinx_domains(env):
+        parser.parse(text, subdocument)
+    return subdocument.children[:]
+
+
+class CollectTimelines(SphinxPostTransform):
+    """Fill in the timelines of collected events, when the document is written.
+
+    This is applied before cross-references are resolved,
+    so that the parsed items can contain them.
+    """
+
+    default_priority = 5
+
+    def run(self, **kwargs: Any) -> None:
+        for node in list(self.document.findall(TimelineCollect)):
+            node.replace_self(self.create_timeline(node))
+
+    def create_timeline(self, node: TimelineCollect) -> TimelineDiv:
+        import jinja2
+
+        options = node["options"]
+        items = get_collected_events(self.env).select(
+            node["tags"],
+            options.get("max-items") or None,
+            "reversed" not in options,
+            node["start"],
+            node["end"],
+        )
+        try:
+            template = get_template_cache(self.env).from_string(node["template"])
+            rendered = render_items(template, items)
+        except jinja2.TemplateError as exc:
+            LOGGER.warning(f"Error rendering template: {exc}", location=node)
+            items, rendered = [], []
+        # templates are written in the source format of the document
+        parser = source_parser(self.document, self.env)
+        parsed = [
+            parse_source(text, self.document, self.env, parser) for text in rendered
+        ]
+        item_nodes = create_item_nodes(items, parsed, options)
+        container = create_container(item_nodes, options)
+        for child in (container[0], *item_nodes):
+            child.source, child.line = node.source, node.line
+        return container
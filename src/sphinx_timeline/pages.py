@@ -0,0 +1,156 @@
+"""Splitting of timelines across multiple HTML pages.
+
+The first page of a timeline is part of its document,
+and the nodes of the other pages are stored (pickled) in the doctree directory,
+then written as additional HTML pages, in the same directory as the document.
+For other builders, the items of all pages are merged back into the first page.
+"""
+from __future__ import annotations
+
+import os
+from pathlib import Path
+import pickle
+from typing import Any, Iterator
+
+from docutils import nodes
+from sphinx.application import Sphinx
+from sphinx.environment import BuildEnvironment
+from sphinx.transforms.post_transforms import SphinxPostTransform
+from sphinx.util.docutils import new_document
+
+PAGES_DIR = "_sphinx_timeline_pages"
+"""The name of the directory, within the doctree directory, to store pages in."""
+
+
+class TimelinePageNav(nodes.General, nodes.Element):
+    """The navigation between the pages of a timeline."""
+
+
+def visit_tl_page_nav(self, node: TimelinePageNav) -> None:
+    """visit tl_page_nav"""
+    links = []
+    if node.get("prev"):
+        uri = self.builder.get_relative_uri(node["page"], node["prev"])
+        links.append(f'<a class="tl-pages-prev" href="{uri}">&laquo; Previous</a>')
+    links.append(
+        f'<span class="tl-pages-current">Page {node["number"]} of {node["total"]}</span>'
+    )
+    if node.get("next"):
+        uri = self.builder.get_relative_uri(node["page"], node["next"])
+        links.append(f'<a class="tl-pages-next" href="{uri}">Next &raquo;</a>')
+    self.body.append(
+        self.starttag(node, "nav", CLASS="tl-pages") + " ".join(links) + "</nav>\n"
+    )
+    raise nodes.SkipNode
+
+
+def page_names(docname: str, serial: int, total: int) -> list[str]:
+    """Return the names of the pages of a timeline, the first being the document."""
+    return [docname] + [
+        f"{docname}_timeline{serial}_{num}" for num in range(2, total + 1)
+    ]
+
+
+def _page_path(env: BuildEnvironment, pagename: str) -> Path:
+    return Path(env.doctreedir) / PAGES_DIR / f"{pagename}.pickle"
+
+
+def get_pages(env: BuildEnvironment) -> dict[str, list[str]]:
+    """Get the mapping of docname -> additional page names, creating it if necessary."""
+    if not isinstance(getattr(env, "timeline_pages", None), dict):
+        env.timeline_pages = {}  # type: ignore[attr-defined]
+    return env.timeline_pages  # type: ignore[attr-defined]
+
+
+def store_page(env: BuildEnvironment, pagename: str, content: list[nodes.Node]) -> None:
+    """Store the nodes of an additional page, of the current document."""
+    path = _page_path(env, pagename)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("wb") as handle:
+        pickle.dump(content, handle, pickle.HIGHEST_PROTOCOL)
+    get_pages(env).setdefault(env.docname, []).append(pagename)
+
+
+def load_page(env: BuildEnvironment, pagename: str) -> list[nodes.Node]:
+    """Load the nodes of an additional page."""
+    with _page_path(env, pagename).open("rb") as handle:
+        return pickle.load(handle)
+
+
+def purge_pages(app: Sphinx, env: BuildEnvironment, docname: str) -> None:
+    """Remove the additional pages of a document, that is being re-read or removed."""
+    for pagename in get_pages(env).pop(docname, ()):
+        try:
+            os.remove(_page_path(env, pagename))
+        except OSError:
+            pass
+
+
+def merge_pages(
+    app: Sphinx, env: BuildEnvironment, docnames: set[str], other: BuildEnvironment
+) -> None:
+    """Merge the additional pages of a parallel read process."""
+    other_pages = get_pages(other)
+    pages = get_pages(env)
+    for docname in docnames:
+        if docname in other_pages:
+            pages[docname] = other_pages[docname]
+
+
+def collect_pages(app: Sphinx) -> Iterator[tuple[str, dict[str, Any], str]]:
+    """Write the additional pages of all timelines (HTML builders only)."""
+    if (not app.builder) or app.builder.format != "html":
+        return
+    env = app.env
+    for docname, pagenames in get_pages(env).items():
+        title = env.titles[docname].astext() if docname in env.titles else docname
+        for pagename in pagenames:
+            document = new_document(str(env.doc2path(docname)))
+            document.extend(load_page(env, pagename))
+            # resolve references, relative to the document
+            env.apply_post_transforms(document, docname)
+            body = "".join(
+                app.builder.render_partial(node)["fragment"]  # type: ignore[attr-defined]
+                for node in document.children[:]
+            )
+            context = {"title": title, "body": body, "timeline_page": True}
+            yield pagename, context, "page.html"
+
+
+def _timeline_list(node: nodes.Node) -> nodes.enumerated_list | None:
+    """Get the list of items, of a (pre-rendered) timeline."""
+    return next(iter(node.findall(nodes.enumerated_list)), None)
+
+
+class MergeTimelinePages(SphinxPostTransform):
+    """For non-HTML builders, which do not write the additional pages of timelines,
+    merge the items of all pages into the first page, and remove the navigation.
+
+    This is applied before cross-references are resolved,
+    so that the merged items can contain them.
+    """
+
+    default_priority = 5
+
+    def is_supported(self) -> bool:
+        builder = getattr(self.env, "_builder_cls", None)  # sphinx >= 9
+        if builder is None:
+            builder = self.app.builder
+        return builder.format != "html"
+
+    def run(self, **kwargs: Any) -> None:
+        for nav in list(self.document.findall(TimelinePageNav)):
+            if nav["number"] == 1:
+                self.merge_pages(nav)
+            nav.parent.remove(nav)
+
+    def merge_pages(self, nav: TimelinePageNav) -> None:
+        index = nav.parent.index(nav)
+        list_node = _timeline_list(nav.parent[index - 1]) if index else None
+        pagename = nav.get("next")
+        while pagename:
+            content = load_page(self.env, pagename)
+            page_list = _timeline_list(content[0])
+            if list_node is not None and page_list is not None:
+                list_node.extend(page_list.children)
+            pagename = content[-1].get("next")
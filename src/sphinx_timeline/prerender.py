@@ -0,0 +1,139 @@
+"""Pre-rendering of timelines to HTML, when the document is read.
+
+A pre-rendered timeline is stored in the doctree as a single node,
+holding the HTML of all its items,
+plus a lightweight list of the items' text, for non-HTML builders.
+This keeps the doctree small, and quick to pickle, transform and write.
+
+The docutils HTML writer is only imported when a timeline is first pre-rendered.
+"""
+from __future__ import annotations
+
+from functools import lru_cache
+import re
+from typing import Any
+
+from docutils import frontend, nodes
+from docutils.utils import new_document
+
+_SUPPORTED = frozenset(
+    (
+        nodes.Text,
+        nodes.paragraph,
+        nodes.emphasis,
+        nodes.strong,
+        nodes.literal,
+        nodes.bullet_list,
+        nodes.enumerated_list,
+        nodes.list_item,
+        nodes.reference,
+    )
+)
+"""Docutils nodes that are written the same by docutils and Sphinx,
+and need no processing by Sphinx (transforms or writer specific rendering).
+"""
+
+
+class TimelineHTML(nodes.General, nodes.Element):
+    """A pre-rendered HTML timeline, with a fallback list for other builders."""
+
+
+def visit_tl_html(self, node: TimelineHTML) -> None:
+    """visit tl_html"""
+    self.body.append(node["html"])
+    raise nodes.SkipNode
+
+
+RE_WORDS_AND_SPACES = re.compile(r"\S+| +|\n")
+
+
+@lru_cache(maxsize=None)
+def _translator_class() -> type[nodes.NodeVisitor]:
+    from docutils.writers import html5_polyglot
+
+    class _HTMLTranslator(html5_polyglot.HTMLTranslator):
+        """A docutils HTML translator, that can also write the timeline divs,
+        and writes inline literals as the Sphinx HTML translator does.
+        """
+
+        def visit_literal(self, node: nodes.literal) -> None:
+            self.body.append(
+                self.starttag(node, "code", "", CLASS="docutils literal notranslate")
+            )
+            for token in RE_WORDS_AND_SPACES.findall(self.encode(node.astext())):
+                if token.strip():
+                    # protect literal text from line wrapping
+                    self.body.append(f'<span class="pre">{token}</span>')
+                elif token in {" ", "\n"}:
+                    # allow breaks at whitespace
+                    self.body.append(token)
+                else:
+                    # protect runs of multiple spaces; the last one can wrap
+                    self.body.append("&#160;" * (len(token) - 1) + " ")
+            self.body.append("</code>")
+            raise nodes.SkipNode
+
+        def visit_TimelineDiv(self, node: nodes.Element) -> None:
+            from sphinx_timeline.main import visit_tl_div
+
+            visit_tl_div(self, node)
+
+        def depart_TimelineDiv(self, node: nodes.Element) -> None:
+            from sphinx_timeline.main import depart_tl_div
+
+            depart_tl_div(self, node)
+
+    return _HTMLTranslator
+
+
+@lru_cache(maxsize=None)
+def _writer_settings() -> Any:
+    from docutils.writers import html5_polyglot
+
+    try:
+        return frontend.get_default_settings(html5_polyglot.Writer)
+    except AttributeError:  # docutils < 0.19
+        return frontend.OptionParser(
+            components=(html5_polyglot.Writer,)
+        ).get_default_values()
+
+
+def can_prerender(node: nodes.Node) -> bool:
+    """Whether a node can be written without processing by Sphinx.
+
+    Only the (exact) node types of ``_SUPPORTED`` can be pre-rendered,
+    and references must be external (with a ``refuri``),
+    everything else (e.g. cross-references, admonitions, code blocks or math)
+    is written by the Sphinx builder.
+    """
+    from sphinx_timeline.main import TimelineDiv
+
+    for child in node.findall():
+        if isinstance(child, TimelineDiv):
+            continue
+        if type(child) not in _SUPPORTED:
+            return False
+        if isinstance(child, nodes.reference) and "refuri" not in child:
+            return False
+    return True
+
+
+def prerender(
+    container: nodes.Element, list_node: nodes.enumerated_list
+) -> TimelineHTML:
+    """Pre-render a timeline container to HTML.
+
+    :param container: the timeline container, which must satisfy ``can_prerender``
+    :param list_node: the timeline list, within the container,
+        from which the fallback list is created
+    """
+    document = new_document("<timeline>", _writer_settings())
+    translator = _translator_class()(document)
+    container.walkabout(translator)
+
+    fallback = nodes.enumerated_list(classes=list_node["classes"])
+    for item in list_node.children:
+        fallback.append(
+            nodes.list_item("", nodes.paragraph("", " ".join(item.astext().split())))
+        )
+    return TimelineHTML("", fallback, html="".join(translator.body))
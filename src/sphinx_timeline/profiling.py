@@ -0,0 +1,169 @@
+"""Opt-in profiling of the timeline directives, enabled by ``timeline_profile = True``.
+
+Each directive records the time spent in each of its phases,
+and the number of events and rendered items.
+The records are stored on the build environment, per document,
+and reported at the end of the build.
+"""
+from __future__ import annotations
+
+from contextlib import contextmanager
+import json
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Iterator
+
+from sphinx.application import Sphinx
+from sphinx.environment import BuildEnvironment
+from sphinx.util import logging
+
+LOGGER = logging.getLogger(__name__)
+
+PHASES = ("read", "validate", "sort", "render", "parse")
+"""The profiled phases of a timeline directive."""
+REPORT_NAME = "timeline_profile.json"
+"""The name of the report file, written to the output directory."""
+SUMMARY_SIZE = 10
+"""The number of (slowest) directives to show in the summary table."""
+
+
+class DirectiveProfile:
+    """The profile of a single timeline directive."""
+
+    __slots__ = ("docname", "lineno", "source", "phases", "events", "items", "_stack")
+
+    def __init__(self, docname: str, lineno: int, source: str) -> None:
+        self.docname = docname
+        self.lineno = lineno
+        self.source = source
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.events = 0
+        self.items = 0
+        self._stack: list[list[float]] = []
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the profile as a JSON serialisable dictionary."""
+        return {
+            "lineno": self.lineno,
+            "source": self.source,
+            "events": self.events,
+            "items": self.items,
+            "phases": self.phases,
+            "total": sum(self.phases.values()),
+        }
+
+
+_ACTIVE: DirectiveProfile | None = None
+"""The profile of the directive currently being run."""
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Time a phase of the active directive profile.
+
+    The time of nested phases is excluded,
+    e.g. validation is nested within reading the events.
+    This is a no-op if no profile is active.
+    """
+    profile = _ACTIVE
+    if profile is None:
+        yield
+        return
+    # [start time, time spent in nested phases]
+    frame = [perf_counter(), 0.0]
+    profile._stack.append(frame)
+    try:
+        yield
+    finally:
+        profile._stack.pop()
+        elapsed = perf_counter() - frame[0]
+        profile.phases[name] += elapsed - frame[1]
+        if profile._stack:
+            profile._stack[-1][1] += elapsed
+
+
+@contextmanager
+def profile_directive(
+    env: BuildEnvironment, lineno: int, source: str
+) -> Iterator[DirectiveProfile | None]:
+    """Profile a directive, if profiling is enabled, and store the result on the env."""
+    global _ACTIVE
+    if not env.config.timeline_profile:
+        yield None
+        return
+    profile = DirectiveProfile(env.docname, lineno, source)
+    _ACTIVE = profile
+    try:
+        yield profile
+    finally:
+        _ACTIVE = None
+        get_profiles(env).setdefault(env.docname, []).append(profile.as_dict())
+
+
+def get_profiles(env: BuildEnvironment) -> dict[str, list[dict[str, Any]]]:
+    """Get the mapping of docname -> directive profiles, creating it if necessary."""
+    if not isinstance(getattr(env, "timeline_profiles", None), dict):
+        env.timeline_profiles = {}  # type: ignore[attr-defined]
+    return env.timeline_profiles  # type: ignore[attr-defined]
+
+
+def purge_profiles(app: Sphinx, env: BuildEnvironment, docname: str) -> None:
+    """Remove the profiles of a document, that is being re-read or removed."""
+    get_profiles(env).pop(docname, None)
+
+
+def merge_profiles(
+    app: Sphinx, env: BuildEnvironment, docnames: set[str], other: BuildEnvironment
+) -> None:
+    """Merge the profiles of a parallel read process."""
+    other_profiles = get_profiles(other)
+    profiles = get_profiles(env)
+    for docname in docnames:
+        if docname in other_profiles:
+            profiles[docname] = other_profiles[docname]
+
+
+def write_profile_report(app: Sphinx, exception: Exception | None) -> None:
+    """Write the JSON report of the directive profiles, and log a summary table."""
+    if exception is not None or not app.config.timeline_profile:
+        return
+    profiles = get_profiles(app.env)
+    totals: dict[str, Any] = dict.fromkeys(PHASES, 0.0)
+    totals.update(directives=0, events=0, items=0)
+    for records in profiles.values():
+        for record in records:
+            for name in PHASES:
+                totals[name] += record["phases"][name]
+            totals["directives"] += 1
+            totals["events"] += record["events"]
+            totals["items"] += record["items"]
+    path = Path(app.outdir) / REPORT_NAME
+    path.write_text(
+        json.dumps({"totals": totals, "documents": profiles}, indent=2),
+        encoding="utf8",
+    )
+    LOGGER.info("[timeline] profile written to: %s", path)
+
+    slowest = sorted(
+        (
+            (f"{docname}:{record['lineno']}", record)
+            for docname, records in profiles.items()
+            for record in records
+        ),
+        key=lambda item: item[1]["total"],
+        reverse=True,
+    )[:SUMMARY_SIZE]
+    if not slowest:
+        return
+    width = max(len("location"), *(len(location) for location, _ in slowest))
+    header = f"{'location':<{width}} {'events':>8} {'items':>8} " + " ".join(
+        f"{name:>9}" for name in (*PHASES, "total")
+    )
+    LOGGER.info("[timeline] slowest directives (times in ms):")
+    LOGGER.info(header)
+    for location, record in slowest:
+        times = (*(record["phases"][name] for name in PHASES), record["total"])
+        LOGGER.info(
+            f"{location:<{width}} {record['events']:>8} {record['items']:>8} "
+            + " ".join(f"{time * 1000:>9.1f}" for time in times)
+        )
@@ -0,0 +1,63 @@
+// On page load,
+// look for all item templates of timelines with the "virtual" render mode,
+// and only mount each item when its list item is scrolled near to the view,
+// adding a "dt-future" or "dt-past" class, based on the current date.
+document.addEventListener("DOMContentLoaded", function () {
+  const now = new Date();
+  const templates = document.querySelectorAll("li.timeline > template.tl-virtual");
+  if (!templates.length) {
+    return;
+  }
+
+  function mount(template) {
+    const content = template.content.cloneNode(true);
+    const item = content.querySelector("div.tl-item[data-dt]");
+    if (item) {
+      const dt = new Date(item.getAttribute("data-dt"));
+      if (isNaN(dt)) {
+        console.warn(`Error parsing date: ${item.getAttribute("data-dt")}`);
+      } else if (dt > now) {
+        item.classList.add("dt-future");
+      } else {
+        item.classList.add("dt-past");
+      }
+    }
+    template.replaceWith(content);
+  }
+
+  if (!("IntersectionObserver" in window)) {
+    for (var i = 0, len = templates.length; i < len; i++) {
+      mount(templates[i]);
+    }
+    return;
+  }
+
+  // one observer per (horizontally scrolling) timeline list,
+  // mounting items within a view width either side of the visible window
+  const observers = new Map();
+  for (var i = 0, len = templates.length; i < len; i++) {
+    const listItem = templates[i].parentElement;
+    const list = listItem.parentElement;
+    if (!observers.has(list)) {
+      observers.set(
+        list,
+        new IntersectionObserver(
+          function (entries, observer) {
+            entries.forEach(function (entry) {
+              if (!entry.isIntersecting) {
+                return;
+              }
+              observer.unobserve(entry.target);
+              const template = entry.target.querySelector(":scope > template.tl-virtual");
+              if (template) {
+                mount(template);
+              }
+            });
+          },
+          { root: list, rootMargin: "0px 100% 0px 100%" }
+        )
+      );
+    }
+    observers.get(list).observe(listItem);
+  }
+});
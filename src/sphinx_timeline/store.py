@@ -0,0 +1,217 @@
+"""A compact, columnar store of normalised events."""
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta, timezone, tzinfo
+import heapq
+from typing import TYPE_CHECKING, Any, Iterable
+
+if TYPE_CHECKING:
+    from dateutil.relativedelta import relativedelta
+
+EPOCH = datetime(1970, 1, 1)
+"""The (naive) epoch, that the stored times are relative to."""
+
+
+def _to_micros(delta: timedelta) -> int:
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+class EventStore:
+    """A columnar store of normalised events.
+
+    Rather than a dictionary per event, with a ``datetime`` and ``relativedelta`` object,
+    the start of each event is stored as UTC epoch microseconds,
+    plus an index into a table of unique (time zone, UTC offset) pairs,
+    the duration as an index into a table of unique durations,
+    and the other fields as a tuple of values,
+    plus an index into a table of unique field names.
+    Index columns use the smallest integer type that fits their values.
+
+    Sorting and filtering by start work on the integer columns,
+    and events are only materialised as dictionaries for the selected items.
+    """
+
+    __slots__ = (
+        "starts",
+        "zone_index",
+        "zones",
+        "duration_index",
+        "durations",
+        "field_index",
+        "fields",
+        "values",
+        "_orders",
+        "_sorted_starts",
+    )
+
+    def __init__(self) -> None:
+        self.starts = array("q")
+        """UTC epoch microseconds, of each event start."""
+        self.zone_index = array("I")
+        self.zones: list[tuple[tzinfo, int]] = []
+        """Unique (time zone, UTC offset microseconds) pairs."""
+        self.duration_index = array("I")
+        """The index of each event's duration, or ``0`` if it has none."""
+        self.durations: list[relativedelta | None] = [None]
+        self.field_index = array("I")
+        self.fields: list[tuple[str, ...]] = []
+        self.values: list[tuple[Any, ...]] = []
+        """The values of each event, other than its start and duration."""
+        self._orders: dict[bool, array] = {}
+        self._sorted_starts: array | None = None
+
+    @classmethod
+    def from_events(cls, events: Iterable[dict[str, Any]]) -> EventStore:
+        """Create a store from normalised events."""
+        store = cls()
+        zone_lookup: dict[tuple[tzinfo, int], int] = {}
+        duration_lookup: dict[relativedelta | None, int] = {None: 0}
+        field_lookup: dict[tuple[str, ...], int] = {}
+        zone_index, duration_index, field_index = [], [], []
+        for event in events:
+            start: datetime = event["start"]
+            offset = start.utcoffset() or timedelta(0)
+            store.starts.append(_to_micros(start.replace(tzinfo=None) - EPOCH - offset))
+            zone = (start.tzinfo or timezone.utc, _to_micros(offset))
+            if zone not in zone_lookup:
+                zone_lookup[zone] = len(store.zones)
+                store.zones.append(zone)
+            zone_index.append(zone_lookup[zone])
+            duration = event.get("duration")
+            if duration not in duration_lookup:
+                duration_lookup[duration] = len(store.durations)
+                store.durations.append(duration)
+            duration_index.append(duration_lookup[duration])
+            fields = tuple(event)
+            if fields not in field_lookup:
+                field_lookup[fields] = len(store.fields)
+                store.fields.append(fields)
+            field_index.append(field_lookup[fields])
+            store.values.append(
+                tuple(
+                    value
+                    for key, value in event.items()
+                    if key not in ("start", "duration")
+                )
+            )
+        store.zone_index = _index_array(zone_index, len(store.zones))
+        store.duration_index = _index_array(duration_index, len(store.durations))
+        store.field_index = _index_array(field_index, len(store.fields))
+        return store
+
+    def __getstate__(self) -> dict[str, Any]:
+        # the sort orders are not pickled, but re-computed on first use
+        return {
+            key: getattr(self, key)
+            for key in self.__slots__
+            if key not in ("_orders", "_sorted_starts")
+        }
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.__init__()  # type: ignore[misc]
+        for key, value in state.items():
+            setattr(self, key, value)
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def start(self, index: int) -> datetime:
+        """Get the start of an event."""
+        tz, offset = self.zones[self.zone_index[index]]
+        wall = EPOCH + timedelta(microseconds=self.starts[index] + offset)
+        return wall.replace(tzinfo=tz)
+
+    def event(self, index: int) -> dict[str, Any]:
+        """Materialise an event as a dictionary."""
+        values = iter(self.values[index])
+        event = {
+            key: None if key in ("start", "duration") else next(values)
+            for key in self.fields[self.field_index[index]]
+        }
+        event["start"] = self.start(index)
+        if "duration" in event:
+            event["duration"] = self.durations[self.duration_index[index]]
+        return event
+
+    def order(self, newest_first: bool = True) -> array:
+        """Get the indices of the events, sorted by start (cached).
+
+        As for ``sorted``, events with the same start keep their original order.
+        """
+        if newest_first not in self._orders:
+            self._orders[newest_first] = array(
+                "I",
+                sorted(
+                    range(len(self)),
+                    key=self.starts.__getitem__,
+                    reverse=newest_first,
+                ),
+            )
+        return self._orders[newest_first]
+
+    def between(
+        self, start: datetime | None = None, end: datetime | None = None
+    ) -> range:
+        """Get the positions, within ``order(newest_first=False)``,
+        of the events starting from ``start`` and up to ``end`` (inclusive).
+
+        The sorted starts are cached, so that this is a binary search.
+        """
+        if self._sorted_starts is None:
+            self._sorted_starts = array(
+                "q", (self.starts[idx] for idx in self.order(False))
+            )
+        return range(
+            0 if start is None else bisect_left(self._sorted_starts, utc_micros(start)),
+            len(self)
+            if end is None
+            else bisect_right(self._sorted_starts, utc_micros(end)),
+        )
+
+    def select(
+        self,
+        limit: int | None = None,
+        newest_first: bool = True,
+        start: datetime | None = None,
+        end: datetime | None = None,
+    ) -> list[dict[str, Any]]:
+        """Select events sorted by start, and materialise them as dictionaries.
+
+        :param limit: if given, only select the first ``limit`` events
+        :param newest_first: sort from the latest start to the earliest
+        :param start: only select events starting at or after this time
+        :param end: only select events starting at or before this time
+        """
+        indices: Iterable[int]
+        if start is not None or end is not None:
+            # the events in the range are a contiguous slice of either sort order
+            positions = self.between(start, end)
+            if newest_first:
+                positions = range(
+                    len(self) - positions.stop, len(self) - positions.start
+                )
+            stop = positions.stop
+            if limit:
+                stop = min(stop, positions.start + limit)
+            indices = self.order(newest_first)[positions.start : stop]
+        elif limit and limit < len(self) and newest_first not in self._orders:
+            select = heapq.nlargest if newest_first else heapq.nsmallest
+            indices = select(limit, range(len(self)), key=self.starts.__getitem__)
+        else:
+            indices = self.order(newest_first)[:limit]
+        return [self.event(index) for index in indices]
+
+
+def _index_array(values: list[int], size: int) -> array:
+    """Create an array of indices, with the smallest type that fits ``size``."""
+    typecode = "B" if size <= 1 << 8 else "H" if size <= 1 << 16 else "I"
+    return array(typecode, values)
+
+
+def utc_micros(value: datetime) -> int:
+    """Convert a datetime to UTC epoch microseconds (naive datetimes are assumed UTC)."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return _to_micros(value - datetime(1970, 1, 1, tzinfo=timezone.utc))
@@ -0,0 +1,165 @@
+"""Compilation and caching of the timeline item templates."""
+from __future__ import annotations
+
+from collections import OrderedDict
+import hashlib
+import os
+from pathlib import Path
+import re
+from typing import TYPE_CHECKING, Any
+
+from sphinx.application import Sphinx
+from sphinx.environment import BuildEnvironment
+
+if TYPE_CHECKING:
+    import jinja2
+
+RE_TEMPLATE_REFERENCE = re.compile(r"{%-?\s*(?:include|import|from|extends)\b")
+"""A (quick) check for tags that reference other templates."""
+
+
+def file_template_source(text: str) -> str:
+    """Convert the text of a template file to its template source.
+
+    For backwards compatibility, each line is followed by a blank line,
+    as when the lines of the file were joined by a line break.
+    """
+    return "\n".join(text.splitlines(keepends=True))
+
+
+def _template_loader(searchpath: str) -> jinja2.BaseLoader:
+    """Create a file system loader, that rejects empty templates."""
+    import jinja2
+
+    class _TemplateLoader(jinja2.FileSystemLoader):
+        def get_source(self, environment: jinja2.Environment, template: str):
+            source, filename, uptodate = super().get_source(environment, template)
+            if not source.strip():
+                raise ValueError("Template cannot be empty")
+            return file_template_source(source), filename, uptodate
+
+    return _TemplateLoader(searchpath, encoding="utf8")
+
+
+class TemplateCache:
+    """A shared jinja environment, with a cache of compiled templates.
+
+    Templates from files (within the source directory) are loaded via the environment's loader,
+    so that jinja's own caching and auto-reload logic applies,
+    and their bytecode is cached on disk, to persist across builds.
+    Templates from directive content are cached in an LRU, keyed by a hash of their source.
+
+    The jinja environment is not pickled (with the build environment),
+    but re-created (and jinja imported) on first use.
+    """
+
+    def __init__(self, srcdir: str | Path, cache_dir: str | Path, size: int) -> None:
+        self.srcdir = Path(os.path.normpath(os.path.abspath(srcdir)))
+        self.cache_dir = Path(cache_dir)
+        self.size = size
+        self._env: jinja2.Environment | None = None
+        self._templates: OrderedDict[str, jinja2.Template] = OrderedDict()
+
+    def __getstate__(self) -> dict[str, Any]:
+        return {"srcdir": self.srcdir, "cache_dir": self.cache_dir, "size": self.size}
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.__init__(**state)  # type: ignore[misc]
+
+    @property
+    def env(self) -> jinja2.Environment:
+        """The shared jinja environment."""
+        if self._env is None:
+            import jinja2
+
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            self._env = jinja2.Environment(
+                loader=_template_loader(str(self.srcdir)),
+                bytecode_cache=jinja2.FileSystemBytecodeCache(str(self.cache_dir)),
+                cache_size=self.size,
+                auto_reload=True,
+            )
+        return self._env
+
+    def from_string(self, source: str) -> jinja2.Template:
+        """Get a compiled template from its source.
+
+        :raises ValueError: if the template is empty
+        :raises jinja2.TemplateError: if the template is invalid
+        """
+        if not source.strip():
+            raise ValueError("Template cannot be empty")
+        key = hashlib.sha256(source.encode("utf8")).hexdigest()
+        if key in self._templates:
+            self._templates.move_to_end(key)
+            return self._templates[key]
+        template = self.env.from_string(source)
+        self._templates[key] = template
+        while len(self._templates) > max(self.size, 0):
+            self._templates.popitem(last=False)
+        return template
+
+    def from_file(self, path: str | Path) -> jinja2.Template:
+        """Get a compiled template from a file.
+
+        :raises ValueError: if the template is empty
+        :raises jinja2.TemplateError: if the template is invalid
+        """
+        try:
+            name = (
+                Path(os.path.normpath(os.path.abspath(path)))
+                .relative_to(self.srcdir)
+                .as_posix()
+            )
+        except ValueError:
+            # outside of the source directory, so not reachable by the loader
+            return self.from_string(
+                file_template_source(Path(path).read_text(encoding="utf8"))
+            )
+        return self.env.get_template(name)
+
+    def includes(self, source: str) -> dict[str, str] | None:
+        """Get the templates referenced by a template source (recursively),
+        i.e. included, imported or extended.
+
+        :returns: mapping of the referenced file paths to their sources,
+            or ``None`` if a template name is dynamic (so only known when rendered)
+        :raises jinja2.TemplateError: if a template is invalid or not found
+        """
+        import jinja2.meta
+
+        found: dict[str, str] = {}
+        sources = [source]
+        while sources:
+            source = sources.pop()
+            if not RE_TEMPLATE_REFERENCE.search(source):
+                continue
+            for name in jinja2.meta.find_referenced_templates(self.env.parse(source)):
+                if name is None:
+                    return None
+                assert self.env.loader is not None
+                text, filename, _ = self.env.loader.get_source(self.env, name)
+                if filename is not None and filename not in found:
+                    found[filename] = text
+                    sources.append(text)
+        return found
+
+
+def _create_template_cache(env: BuildEnvironment) -> TemplateCache:
+    return TemplateCache(
+        env.srcdir,
+        Path(env.doctreedir) / "_sphinx_timeline_jinja",
+        env.config.timeline_template_cache_size,
+    )
+
+
+def get_template_cache(env: BuildEnvironment) -> TemplateCache:
+    """Get the template cache of the build environment, creating it if necessary."""
+    if not isinstance(getattr(env, "timeline_templates", None), TemplateCache):
+        env.timeline_templates = _create_template_cache(env)  # type: ignore
+    return env.timeline_templates  # type: ignore[attr-defined]
+
+
+def init_template_cache(app: Sphinx) -> None:
+    """Create a new template cache for the build."""
+    app.env.timeline_templates = _create_template_cache(app.env)  # type: ignore
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+import pytest
+from sphinx.application import Sphinx
+from sphinx.util.docutils import docutils_namespace
+
+
+class SphinxProject:
+    """A Sphinx project in a temporary directory, which can be built repeatedly.
+
+    By default, every build shares the same output and doctree directories,
+    so later builds are incremental.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.srcdir = path / "src"
+        self.outdir = path / "out"
+        self.doctreedir = path / "doctrees"
+        self.srcdir.mkdir()
+        self.write("conf.py", "extensions = ['sphinx_timeline']\n")
+
+    def write(self, name: str, content: str) -> Path:
+        """Write a source file, returning its path."""
+        path = self.srcdir / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+        return path
+
+    def read(self, name: str, outdir: Path | None = None) -> str:
+        """Read an output file."""
+        return (outdir or self.outdir).joinpath(name).read_text()
+
+    @contextmanager
+    def app(
+        self,
+        buildername: str = "html",
+        outdir: Path | None = None,
+        doctreedir: Path | None = None,
+        **kwargs,
+    ) -> Iterator[Sphinx]:
+        """Create an application, to inspect it before or after building."""
+        with docutils_namespace():
+            yield Sphinx(
+                self.srcdir,
+                self.srcdir,
+                outdir or self.outdir,
+                doctreedir or self.doctreedir,
+                buildername,
+                **kwargs,
+            )
+
+    def build(self, buildername: str = "html", **kwargs) -> Sphinx:
+        """Build the project, returning the application."""
+        with self.app(buildername, **kwargs) as app:
+            app.build()
+        return app
+
+
+@pytest.fixture
+def sphinx_project(tmp_path) -> SphinxProject:
+    """A Sphinx project, which loads the extension."""
+    return SphinxProject(tmp_path)
@@ -0,0 +1,133 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from sphinx_timeline.collect import CollectedEvents
+
+
+def _event(name, year, tags):
+    return {
+        "name": name,
+        "start": datetime(year, 1, 1, tzinfo=timezone.utc),
+        "tags": tags,
+    }
+
+
+def test_collected_events():
+    """Test events are indexed by tag, and removed with their document."""
+    collected = CollectedEvents()
+    collected.add("doc2", _event("b", 2022, ["release"]))
+    collected.add("doc1", _event("a", 2021, ["release", "major"]))
+    collected.add("doc1", _event("c", 2023, ["incident"]))
+    collected.add("doc3", _event("d", 2022, []))
+
+    def _names(*args, **kwargs):
+        return [e["name"] for e in collected.select(*args, **kwargs)]
+
+    assert _names(["release"]) == ["b", "a"]
+    assert _names(["release"], newest_first=False) == ["a", "b"]
+    assert _names(["release", "incident"]) == ["c", "b", "a"]
+    assert _names(["*"], 2) == ["c", "d"]
+    assert _names(["*"], start=datetime(2022, 1, 1), end=datetime(2022, 1, 1)) == [
+        "d",
+        "b",
+    ]
+    signature = collected.signature(["release"])
+    assert collected.signature(["incident"]) != signature
+
+    collected.purge_doc("doc1")
+    assert _names(["*"]) == ["d", "b"]
+    assert collected.signature(["release"]) != signature
+
+    other = CollectedEvents()
+    other.add("doc1", _event("a", 2021, ["release"]))
+    other.add_collector("doc4", ["release"])
+    collected.merge(other, ["doc1", "doc4"])
+    assert _names(["release"]) == ["b", "a"]
+    assert collected.collectors == {"doc4": {"release"}}
+
+
+def test_collect_build(sphinx_project):
+    """Test collected timelines are re-written, but not re-read, when events change."""
+    sphinx_project.write(
+        "index.rst", "Title\n=====\n\n.. toctree::\n\n   a\n   b\n   all\n"
+    )
+    sphinx_project.write(
+        "a.rst",
+        "A\n=\n\n.. timeline-event:: Release 1\n   :start: 2021-02-03\n"
+        "   :tags: release\n\n   First *release*.\n",
+    )
+    sphinx_project.write(
+        "b.rst",
+        "B\n=\n\n.. timeline-event:: Outage\n   :start: 2021-03-03\n"
+        "   :tags: incident\n",
+    )
+    sphinx_project.write(
+        "all.rst",
+        "All\n===\n\n.. timeline::\n   :collect: release\n\n"
+        "   {{e.name}} (:doc:`/{{e.docname}}`)\n\n   {{e.content}}\n",
+    )
+
+    def _build():
+        """Build, and return the all.html mtime and the re-read documents."""
+        with sphinx_project.app() as app:
+            read_times = dict(app.env.all_docs)
+            app.build()
+        html = sphinx_project.outdir / "all.html"
+        return html.stat().st_mtime_ns, {
+            docname
+            for docname, read_time in app.env.all_docs.items()
+            if read_times.get(docname) != read_time
+        }
+
+    mtime, reread = _build()
+    assert reread == {"index", "a", "b", "all"}
+    html = sphinx_project.read("all.html")
+    assert 'Release 1 (<a class="reference internal" href="a.html">' in html
+    assert "<p>First <em>release</em>.</p>" in html
+    assert "Outage" not in html
+
+    # a new tagged event, in another document
+    sphinx_project.write(
+        "b.rst",
+        "B\n=\n\n.. timeline-event:: Release 2\n   :start: 2022-02-03\n"
+        "   :tags: release\n",
+    )
+    new_mtime, reread = _build()
+    assert reread == {"b"}
+    assert new_mtime != mtime
+    assert "Release 2" in sphinx_project.read("all.html")
+
+
+def test_collect_myst(sphinx_project):
+    """Test collected timelines are parsed in the source format of their document."""
+    pytest.importorskip("myst_parser")
+    sphinx_project.write("conf.py", "extensions = ['myst_parser', 'sphinx_timeline']\n")
+    sphinx_project.write(
+        "index.md",
+        "# Title\n\n```{timeline-event} Release 1\n:start: 2021-02-03\n```\n\n"
+        "```{timeline}\n:collect: '*'\n\n[link](https://example.com) {{e.name}}\n```\n",
+    )
+    sphinx_project.build()
+    html = sphinx_project.read("index.html")
+    assert 'href="https://example.com">link</a> Release 1' in html
+
+
+def test_collect_template_file(sphinx_project):
+    """Test a template file is rendered as for other timelines, with its includes tracked."""
+    sphinx_project.write(
+        "index.rst",
+        "Title\n=====\n\n.. timeline-event:: Release 1\n   :start: 2021-02-03\n\n"
+        ".. timeline::\n   :collect: *\n   :template: item.txt\n",
+    )
+    sphinx_project.write(
+        "item.txt", "Line1 {{e.name}}\nLine2\n{% include 'more.txt' %}\n"
+    )
+    sphinx_project.write("more.txt", "Line3 a\n")
+    sphinx_project.build()
+    html = sphinx_project.read("index.html")
+    assert "<p>Line1 Release 1</p>\n<p>Line2</p>\n<p>Line3 a</p>" in html
+
+    sphinx_project.write("more.txt", "Line3 b\n")
+    sphinx_project.build()
+    assert "<p>Line3 b</p>" in sphinx_project.read("index.html")
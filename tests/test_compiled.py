@@ -0,0 +1,134 @@
+from datetime import date, datetime, timezone
+import pickle
+
+import pytest
+
+from sphinx_timeline.cli import main
+from sphinx_timeline.compiled import (
+    HEADER,
+    CompiledEvents,
+    compiled_digest,
+    write_compiled,
+)
+from sphinx_timeline.dependencies import file_digest
+from sphinx_timeline.events import EventsCache, normalise_events
+from sphinx_timeline.store import EventStore
+
+
+@pytest.fixture
+def events():
+    return normalise_events(
+        [
+            {"name": "a", "start": "2021-03-28 02:30 (Europe/Zurich)", "tags": ["x"]},
+            {"start": "2021-02-03", "name": "b", "duration": "1 day 90 s"},
+            {"start": "2020-02-03T10:00+02:00", "duration": "0 days"},
+            {"start": "2021-02-03", "name": "d", "other": None},
+            {"start": datetime(1900, 1, 1, 0, 0, 0, 5)},
+        ]
+    )
+
+
+@pytest.mark.parametrize(
+    "limit,newest_first,start,end",
+    [
+        (None, True, None, None),
+        (None, False, None, None),
+        (2, True, None, None),
+        (2, False, None, None),
+        (None, True, datetime(2021, 2, 3, tzinfo=timezone.utc), None),
+        (1, False, None, datetime(2021, 2, 3)),
+    ],
+)
+def test_compiled_select(tmp_path, events, limit, newest_first, start, end):
+    """Test compiled events are selected as for the store they are compiled from."""
+    store = EventStore.from_events(events)
+    write_compiled(store, tmp_path / "events.tlbin")
+    compiled = CompiledEvents.open(tmp_path / "events.tlbin")
+    assert len(compiled) == 5
+    selected = compiled.select(limit, newest_first, start, end)
+    assert selected == store.select(limit, newest_first, start, end)
+    assert [event["start"].tzinfo for event in selected] == [
+        event["start"].tzinfo for event in store.select(limit, newest_first, start, end)
+    ]
+    # the columns are read from the mapped file
+    assert isinstance(compiled.starts, memoryview)
+    with pytest.raises(TypeError):
+        pickle.dumps(compiled)
+
+
+def test_compile_cli(tmp_path, capsys):
+    """Test compiling an events file, and reading it by its format."""
+    tmp_path.joinpath("events.yaml").write_text(
+        "- {start: 2021-01-01, name: a, end: 2021-01-02}\n- {start: 2022-01-01, name: b}\n"
+    )
+    assert main(["compile", str(tmp_path / "events.yaml")]) == 0
+    assert "Compiled 2 events" in capsys.readouterr().out
+    events = EventsCache().get(tmp_path / "events.tlbin", "tlbin", "index")
+    # dates (other than the start) are stored as strings
+    assert events.select(1) == [
+        {"start": datetime(2022, 1, 1, tzinfo=timezone.utc), "name": "b"}
+    ]
+    assert events.event(0)["end"] == str(date(2021, 1, 2))
+
+    tmp_path.joinpath("events.txt").write_text("- {name: a}\n")
+    assert main(["compile", "-f", "yaml", str(tmp_path / "events.txt")]) == 1
+    assert "must contain 'start' key" in capsys.readouterr().err
+
+
+@pytest.mark.parametrize("content", [b"", b"- {start: 2021-01-01}\n"])
+def test_compiled_invalid(tmp_path, content):
+    """Test an invalid compiled file is reported."""
+    tmp_path.joinpath("events.tlbin").write_bytes(content)
+    with pytest.raises(ValueError, match="Not a compiled events file"):
+        CompiledEvents.open(tmp_path / "events.tlbin")
+
+
+def test_compiled_digest(tmp_path, events):
+    """Test the digest of the content is stored in the header, for dependency tracking."""
+    import hashlib
+
+    path = tmp_path / "events.tlbin"
+    write_compiled(EventStore.from_events(events), path)
+    digest = compiled_digest(path)
+    assert digest == hashlib.sha256(path.read_bytes()[HEADER.size :]).hexdigest()
+    assert file_digest(str(path)) == digest
+    # re-compiling the same events gives the same digest
+    write_compiled(EventStore.from_events(events), path)
+    assert compiled_digest(path) == digest
+    write_compiled(EventStore.from_events(events[:-1]), path)
+    assert compiled_digest(path) != digest
+    tmp_path.joinpath("events.yaml").write_text("- {start: 2021-01-01}\n")
+    assert compiled_digest(tmp_path / "events.yaml") is None
+
+
+def test_compiled_truncated(tmp_path, events):
+    """Test a truncated compiled file is reported."""
+    path = tmp_path / "events.tlbin"
+    write_compiled(EventStore.from_events(events), path)
+    path.write_bytes(path.read_bytes()[:-1])
+    with pytest.raises(ValueError, match="Truncated"):
+        CompiledEvents.open(path)
+
+
+def test_compiled_build(sphinx_project):
+    """Test a timeline of compiled events."""
+    events = sphinx_project.write(
+        "events.yaml",
+        "".join(
+            f"- {{start: 20{idx:02d}-01-01, name: e{idx:02d}}}\n" for idx in range(20)
+        ),
+    )
+    assert main(["compile", str(events)]) == 0
+    sphinx_project.write(
+        "index.rst",
+        "Title\n=====\n\n.. timeline::\n   :events: events.tlbin\n   :events-format: tlbin\n"
+        "   :from: 2005-01-01\n   :max-items: 3\n   :reversed:\n\n   {{e.name}}\n",
+    )
+    app = sphinx_project.build()
+    assert not app._warncount
+    html = sphinx_project.read("index.html")
+    assert [name for name in ("e04", "e05", "e06", "e07", "e08") if name in html] == [
+        "e05",
+        "e06",
+        "e07",
+    ]
@@ -1,3 +1,5 @@
+from datetime import datetime, timezone
+
 import pytest
 
 from sphinx_timeline import dtime
@@ -40,3 +42,58 @@ def test_fmt_daterange(start, duration, kwargs, expected):
     dt = dtime.to_datetime(start)
     rng = dtime.parse_duration(duration)
     assert dtime.fmt_daterange(dt, rng, **kwargs) == expected
+
+
+@pytest.mark.parametrize(
+    "value,expected",
+    [
+        ("", {}),
+        ("1 day", {"days": 1}),
+        ("1day 2hour 30min", {"days": 1, "hours": 2, "minutes": 30}),
+        ("30 minutes 4 hours", {"hours": 4, "minutes": 30}),
+        ("2 months 3 years 10s", {"years": 3, "months": 2, "seconds": 10}),
+        ("1 hour 2 hours", {"hours": 1}),
+    ],
+)
+def test_parse_duration(value, expected):
+    """Test parsing of durations."""
+    assert dtime.parse_duration(value) == dtime.relativedelta(**expected)
+
+
+def test_to_datetimes():
+    """Test bulk conversion to datetimes."""
+    values = ["2021-02-03 22:00 (Europe/Zurich)", "2021-02-03", "2021-02-03"]
+    results = dtime.to_datetimes(values)
+    assert [dt.isoformat() for dt in results] == [
+        "2021-02-03T22:00:00+01:00",
+        "2021-02-03T00:00:00+00:00",
+        "2021-02-03T00:00:00+00:00",
+    ]
+    assert results == [dtime.to_datetime(value) for value in values]
+    with pytest.raises(ValueError, match="Invalid timezone"):
+        dtime.to_datetimes(["2021-02-03 (Not/AZone)"])
+
+
+def test_dtrange_str_lazy():
+    """Test the date range string is only formatted when used."""
+    rng = dtime.DtRangeStr(dtime.to_datetime("2021-02-03"), dtime.parse_duration("1d"))
+    assert rng._cache is None
+    assert str(rng) == "Wed 3rd - Thu 4th Feb 2021"
+    assert rng(day_name=False) == "3rd - 4th Feb 2021"
+    assert rng._cache == {
+        (): "Wed 3rd - Thu 4th Feb 2021",
+        (("day_name", False),): "3rd - 4th Feb 2021",
+    }
+
+
+def test_relative_datetime():
+    now = datetime(2021, 3, 1, tzinfo=timezone.utc)
+    assert dtime.relative_datetime("now", now) == now
+    assert dtime.relative_datetime("1 mon", now) == datetime(
+        2021, 2, 1, tzinfo=timezone.utc
+    )
+    assert dtime.relative_datetime("90 days", now, past=False) == datetime(
+        2021, 5, 30, tzinfo=timezone.utc
+    )
+    with pytest.raises(ValueError, match="Invalid relative time"):
+        dtime.relative_datetime("yesterday", now)
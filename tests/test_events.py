@@ -0,0 +1,179 @@
+from io import StringIO
+import os
+
+import pytest
+
+from sphinx_timeline.events import (
+    EventsCache,
+    find_events_files,
+    load_events,
+    read_events,
+    select_backend,
+)
+
+
+def test_events_cache(tmp_path):
+    """Test the events cache is keyed on file content."""
+    path = tmp_path / "events.yaml"
+    path.write_text("- start: 2021-02-03\n")
+    cache = EventsCache()
+    events = cache.get(path, "yaml", "doc1")
+    assert events.start(0).isoformat() == "2021-02-03T00:00:00+00:00"
+    assert (cache.hits, cache.misses) == (0, 1)
+    # same file, different document
+    assert cache.get(path, "yaml", "doc2") is events
+    assert (cache.hits, cache.misses) == (1, 1)
+    # re-written with identical content, but a new mtime
+    path.write_text("- start: 2021-02-03\n")
+    os.utime(path, ns=(0, 0))
+    assert cache.get(path, "yaml", "doc1") is events
+    assert (cache.hits, cache.misses) == (2, 1)
+    # changed content
+    path.write_text("- start: 2022-02-03\n")
+    assert cache.get(path, "yaml", "doc1") is not events
+    assert (cache.hits, cache.misses) == (2, 2)
+    # eviction of entries with no documents
+    cache.purge_doc("doc1")
+    assert cache.evict_stale() == 0
+    cache.purge_doc("doc2")
+    assert cache.evict_stale() == 1
+    assert not cache.entries
+
+
+def test_events_cache_invalid(tmp_path):
+    """Test invalid events are not cached."""
+    path = tmp_path / "events.yaml"
+    path.write_text("- name: no start\n")
+    cache = EventsCache()
+    with pytest.raises(ValueError, match="must contain 'start' key"):
+        cache.get(path, "yaml", "doc1")
+    assert not cache.entries
+
+
+def test_events_cache_merge(tmp_path):
+    """Test merging caches from parallel reads."""
+    path = tmp_path / "events.yaml"
+    path.write_text("- start: 2021-02-03\n")
+    cache1, cache2 = EventsCache(), EventsCache()
+    cache1.get(path, "yaml", "doc1")
+    cache2.get(path, "yaml", "doc2")
+    # as if read in a different process
+    cache2.stats = {-1: cache2.stats.popitem()[1]}
+    cache1.merge(cache2)
+    assert cache1.entries[(str(path), "yaml", None)].docnames == {"doc1", "doc2"}
+    assert cache1.misses == 2
+
+
+@pytest.mark.parametrize(
+    "fmt,content",
+    [
+        ("csv", "start,name\n2021-01-01,a\n2023-01-01,c\n2022-01-01,b\n"),
+        (
+            "jsonl",
+            '{"start": "2021-01-01", "name": "a"}\n\n'
+            '{"start": "2023-01-01", "name": "c"}\n'
+            '{"start": "2022-01-01", "name": "b"}\n',
+        ),
+    ],
+)
+def test_load_events_limit(fmt, content):
+    """Test selecting the first events of a streamed format."""
+    assert [e["name"] for e in load_events(StringIO(content), fmt)] == ["a", "c", "b"]
+    assert [e["name"] for e in load_events(StringIO(content), fmt, 2)] == ["c", "b"]
+    assert [e["name"] for e in load_events(StringIO(content), fmt, 2, False)] == [
+        "a",
+        "b",
+    ]
+
+
+def test_load_events_invalid():
+    """Test errors are reported for streamed events."""
+    with pytest.raises(ValueError, match="Error parsing data: line 3: "):
+        load_events(StringIO('{"start": "2021-01-01"}\n\n{\n'), "jsonl", 1)
+    with pytest.raises(ValueError, match="item 1: each data item must be a dict"):
+        load_events(StringIO('{"start": "2021-01-01"}\n[]\n'), "jsonl", 1)
+    with pytest.raises(ValueError, match="Data must not be empty"):
+        load_events(StringIO(""), "jsonl", 1)
+
+
+def test_events_cache_preload(tmp_path):
+    """Test preloading the cache, before documents are read."""
+    path = tmp_path / "events.yaml"
+    path.write_text("- start: 2021-02-03\n")
+    tmp_path.joinpath("invalid.yaml").write_text("- name: no start\n")
+    key = (str(path), "yaml", None)
+    invalid_key = (str(tmp_path / "invalid.yaml"), "yaml", None)
+    missing_key = (str(tmp_path / "missing.yaml"), "yaml", None)
+    cache = EventsCache()
+    requests = {key: {"doc1"}, invalid_key: {"doc2"}, missing_key: {"doc3"}}
+    assert cache.preload(requests) == 1
+    assert cache.preload(requests) == 0
+    assert list(cache.entries) == [key]
+    assert cache.entries[key].docnames == {"doc1"}
+    cache.get(path, "yaml", "doc1")
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_events_cache_preload_pool(tmp_path):
+    """Test preloading files in a process pool."""
+    requests = {}
+    for name in ("a", "b"):
+        tmp_path.joinpath(f"{name}.jsonl").write_text('{"start": "2021-02-03"}\n')
+        requests[(str(tmp_path / f"{name}.jsonl"), "jsonl", (1, True))] = {name}
+    cache = EventsCache()
+    assert cache.preload(requests, processes=2, min_pool_size=0) == 2
+    assert {e.docnames.pop() for e in cache.entries.values()} == {"a", "b"}
+
+
+@pytest.mark.parametrize("parallel", [0, 2])
+def test_find_events_files(sphinx_project, parallel):
+    """Test events files are found and preloaded, before reading documents."""
+    events = sphinx_project.write("events.csv", "start\n2021-02-03\n2022-02-03\n")
+    directive = ".. timeline::\n   :events: /events.csv\n   :events-format: csv\n"
+    sphinx_project.write(
+        "index.rst",
+        "Title\n=====\n\n.. toctree::\n\n   sub/doc\n\n"
+        + directive
+        + "\n   {{dt}}\n\n"
+        + directive
+        + "   :max-items: 1\n\n   {{dt}}\n",
+    )
+    sphinx_project.write(
+        "sub/doc.rst",
+        "Sub\n===\n\n.. timeline::\n   :events: ../events.csv\n"
+        "   :events-format: csv\n\n   {{dt}}\n",
+    )
+    with sphinx_project.app(parallel=parallel) as app:
+        assert find_events_files(app.env, ["index", "sub/doc"]) == {
+            (str(events), "csv", None): {"index", "sub/doc"},
+            (str(events), "csv", (1, True)): {"index"},
+        }
+        app.build()
+    cache = app.env.timeline_events_cache
+    assert len(cache.entries) == 2
+    assert (cache.hits, cache.misses) == (3, 2)
+
+
+@pytest.mark.parametrize(
+    "fmt,content",
+    [
+        ("yaml", "- start: 2021-02-03\n  name: a\n  n: 1.5\n"),
+        ("json", '[{"start": "2021-02-03", "name": "a", "n": 1.5}]'),
+        ("jsonl", '{"start": "2021-02-03", "name": "a", "n": 1.5}\n'),
+    ],
+)
+def test_events_backends(fmt, content):
+    """Test the backends parse events the same."""
+    try:
+        names = select_backend("python")
+        assert names == {"yaml": "python", "json": "python"}
+        expected = read_events(StringIO(content), fmt)
+        select_backend("auto")
+        assert read_events(StringIO(content), fmt) == expected
+        # errors are reported by the pure Python parser
+        with pytest.raises(Exception, match="line 1 column 2"):
+            read_events(StringIO("[x"), "json")
+    finally:
+        select_backend("auto")
+    with pytest.raises(ValueError, match="Unknown events backend"):
+        select_backend("other")
@@ -0,0 +1,38 @@
+import subprocess
+import sys
+
+HEAVY_MODULES = {
+    "concurrent.futures",
+    "csv",
+    "dateutil",
+    "docutils.writers.html5_polyglot",
+    "jinja2",
+    "uuid",
+    "yaml",
+    "zoneinfo",
+}
+"""Modules only imported on first use, rather than when the extension is loaded."""
+
+SCRIPT = """
+import sys
+import sphinx.application, sphinx.util.docutils, sphinx.transforms.post_transforms
+before = set(sys.modules)
+import sphinx_timeline
+print(" ".join(sorted(set(sys.modules) - before)))
+"""
+
+
+def test_heavy_imports():
+    """Test loading the extension does not import its heavy dependencies.
+
+    The import time is measured by ``benchmarks/test_import.py``.
+    """
+    result = subprocess.run(
+        [sys.executable, "-c", SCRIPT], capture_output=True, check=True, text=True
+    )
+    heavy = {
+        name
+        for name in result.stdout.split()
+        if any(name == mod or name.startswith(f"{mod}.") for mod in HEAVY_MODULES)
+    }
+    assert not heavy
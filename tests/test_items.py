@@ -0,0 +1,139 @@
+import pickle
+
+from docutils import nodes
+from sphinx import addnodes
+
+from sphinx_timeline.items import ItemCache, is_reusable
+
+
+def test_is_reusable():
+    """Test only nodes without parse side effects are reusable."""
+    para = nodes.paragraph("", "", nodes.emphasis("", "a"))
+    assert is_reusable([para, nodes.bullet_list()])
+    assert is_reusable([nodes.paragraph("", "", addnodes.pending_xref("", refdoc="a"))])
+    assert not is_reusable([para, nodes.paragraph("", "", nodes.target())])
+    assert not is_reusable([nodes.section(ids=["title"])])
+    assert not is_reusable([nodes.paragraph("", "", nodes.reference(refname="x"))])
+    assert not is_reusable([addnodes.index(entries=[])])
+    assert not is_reusable([nodes.system_message("warning")])
+
+
+def test_item_cache():
+    """Test items are stored detached, with relative lines, and evicted when over size."""
+    cache = ItemCache(2)
+    event = {"name": "a", "start": "2021-01-01"}
+    key = cache.key("{{e.name}}", event, "doc", "")
+    assert key != cache.key("{{e.name}} ", event, "doc", "")
+    assert key != cache.key("{{e.name}}", event, "other", "")
+    assert key != cache.key("{{e.name}}", {**event, "name": "b"}, "doc", "")
+    assert key != cache.key("{{e.name}}", event, "doc", "default_role=literal")
+
+    document = nodes.document(None, None)
+    para = nodes.paragraph("", "", nodes.Text("a"))
+    para.source, para.line, para.document = "doc.rst", 12, document
+    cache.store(key, "a", [para], 10)
+    cache.store("target", "_`a`", [nodes.target()], 10)
+    assert cache.get("target").children is None
+    cached = pickle.loads(pickle.dumps(cache)).items[key]
+    assert cached.text == "a"
+    cached = cache.get(key)
+    assert cached.text == "a"
+    (child,) = cache.get_nodes(cached, 20, "other.rst")
+    assert child is not para
+    assert (child.astext(), child.source, child.line) == ("a", "other.rst", 22)
+    assert child.document is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    cache.store("other", "b", [], 0)
+    # the least recently used is evicted
+    assert list(cache.items) == [key, "other"]
+    assert cache.get("target") is None
+
+
+def test_item_cache_build(sphinx_project, tmp_path):
+    """Test unchanged items are reused on re-build, with the same output as a fresh build."""
+    events = sphinx_project.write(
+        "events.yaml",
+        "- {start: 2021-01-01, name: a}\n- {start: 2022-01-01, name: b}\n"
+        "- {start: 2023-01-01, name: c}\n",
+    )
+    content = (
+        "Title\n=====\n\n.. timeline::\n   :events: events.yaml\n\n"
+        "   **{{e.name}}** (:doc:`index`)\n\n   .. _target-{{e.name}}:\n\n   - item\n"
+    )
+    sphinx_project.write("index.rst", content)
+
+    def _build(**kwargs):
+        app = sphinx_project.build(**kwargs)
+        return app.env.timeline_items, sphinx_project.read(
+            "index.html", kwargs.get("outdir")
+        )
+
+    cache, _ = _build()
+    assert (cache.hits, cache.misses) == (0, 3)
+    # the items with a target are not reused
+    sphinx_project.write(
+        "index.rst", content.replace("   .. _target-{{e.name}}:\n\n", "")
+    )
+    cache, _ = _build()
+    assert (cache.hits, cache.misses) == (0, 3)
+
+    # move the timeline, and change one of the events
+    sphinx_project.write(
+        "index.rst",
+        "Title\n=====\n\nIntro\n\n"
+        + content.split("=====\n\n", 1)[1].replace("   .. _target-{{e.name}}:\n\n", ""),
+    )
+    events.write_text(events.read_text().replace("name: b", "name: x"))
+    cache, html = _build()
+    assert (cache.hits, cache.misses) == (2, 1)
+    assert "<strong>x</strong>" in html
+    _, fresh = _build(outdir=tmp_path / "fresh", doctreedir=tmp_path / "fresh_doctrees")
+    assert html == fresh
+
+
+def test_item_cache_invalidation(sphinx_project):
+    """Test cached items are not reused when the configuration or an included template changes."""
+    sphinx_project.write("item.txt", "`{{e.name}}`\n")
+    sphinx_project.write(
+        "index.rst",
+        "Title\n=====\n\n.. timeline::\n\n   - {start: 2021-01-01, name: a}\n"
+        "   ---\n   {% include 'item.txt' %}\n",
+    )
+
+    def _build():
+        sphinx_project.build()
+        return sphinx_project.read("index.html")
+
+    assert "<cite>a</cite>" in _build()
+    sphinx_project.write(
+        "conf.py", "extensions = ['sphinx_timeline']\ndefault_role = 'literal'\n"
+    )
+    assert '<span class="pre">a</span>' in _build()
+    sphinx_project.write("item.txt", "**{{e.name}}**\n")
+    assert "<strong>a</strong>" in _build()
+
+
+def test_item_cache_parse_context(sphinx_project):
+    """Test cached items are not reused when the parse state of the document changes."""
+    content = (
+        "Title\n=====\n\n.. py:function:: b.f\n\n{}.. currentmodule:: {}\n\n"
+        ".. timeline::\n\n   - {{start: 2021-01-01, name: a}}\n"
+        "   ---\n   `{{{{e.name}}}}` :py:func:`f`\n"
+    )
+
+    link = '<a class="reference internal" href="#b.f"'
+
+    def _build(default_role, module):
+        sphinx_project.write("index.rst", content.format(default_role, module))
+        sphinx_project.build()
+        return sphinx_project.read("index.html")
+
+    html = _build("", "a")
+    assert "<cite>a</cite>" in html
+    assert link not in html
+    html = _build(".. default-role:: literal\n\n", "a")
+    assert '<span class="pre">a</span>' in html
+    assert link not in html
+    # the current module is stored on the cross-reference
+    assert link in _build(".. default-role:: literal\n\n", "b")
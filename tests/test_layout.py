@@ -0,0 +1,26 @@
+import pytest
+
+from sphinx_timeline.layout import assign_lanes, lane_positions, pixels
+
+
+def test_assign_lanes():
+    """Test intervals are assigned to the lowest lane they do not overlap in."""
+    assert assign_lanes([]) == []
+    assert assign_lanes([(0, 10), (5, 6), (6, 8), (10, 12), (7, 11)]) == [0, 1, 1, 0, 2]
+    # the lowest free lane is reused, rather than the earliest freed
+    assert assign_lanes([(0, 4), (1, 3), (2, 10), (5, 6)]) == [0, 1, 2, 0]
+
+
+def test_lane_positions():
+    """Test items are at least the minimum width, and positioned from the earliest."""
+    day = 86_400_000_000
+    positions = lane_positions([(day, 3 * day), (2 * day, 2 * day)], 10, 15)
+    assert [tuple(p) for p in positions] == [(0, 0, 20, 20), (1, 10, 15, 0)]
+
+
+def test_pixels():
+    assert pixels("10") == 10
+    assert pixels(" 2.5px") == 2.5
+    for value in ("0", "10%", "-1", "", None):
+        with pytest.raises(ValueError):
+            pixels(value)
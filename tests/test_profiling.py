@@ -0,0 +1,49 @@
+import json
+
+from sphinx_timeline import profiling
+
+
+def test_phase_nested(monkeypatch):
+    """Test the time of nested phases is excluded from the outer phase."""
+    times = iter([0.0, 1.0, 3.0, 6.0])
+    monkeypatch.setattr(profiling, "perf_counter", lambda: next(times))
+    profile = profiling.DirectiveProfile("index", 1, "<inline>")
+    monkeypatch.setattr(profiling, "_ACTIVE", profile)
+    with profiling.phase("read"):
+        with profiling.phase("validate"):
+            pass
+    assert profile.phases["read"] == 4.0
+    assert profile.phases["validate"] == 2.0
+    assert profile.as_dict()["total"] == 6.0
+
+
+def test_phase_inactive():
+    """Test phases are not recorded if no profile is active."""
+    with profiling.phase("read"):
+        pass
+
+
+def test_profile_report(sphinx_project):
+    """Test a profile report is written at the end of the build."""
+    sphinx_project.write(
+        "conf.py", "extensions = ['sphinx_timeline']\ntimeline_profile = True\n"
+    )
+    sphinx_project.write(
+        "index.rst",
+        "Title\n=====\n\n.. timeline::\n   :events: events.yaml\n   :max-items: 2\n\n"
+        "   {{dt}}\n\n.. timeline::\n\n   - start: 2021-02-03\n   ---\n   {{dt}}\n",
+    )
+    sphinx_project.write(
+        "events.yaml", "".join(f"- start: 202{idx}-02-03\n" for idx in range(3))
+    )
+    sphinx_project.build()
+    report = json.loads(sphinx_project.read(profiling.REPORT_NAME))
+    records = report["documents"]["index"]
+    assert [(r["lineno"], r["source"]) for r in records] == [
+        (4, "events.yaml"),
+        (10, "<inline>"),
+    ]
+    assert [(r["events"], r["items"]) for r in records] == [(3, 2), (1, 1)]
+    assert set(records[0]["phases"]) == set(profiling.PHASES)
+    assert report["totals"]["directives"] == 2
+    assert report["totals"]["items"] == 3
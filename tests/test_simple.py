@@ -17,6 +17,12 @@ def test_posttransform_html(file_params, sphinx_doctree: CreateDoctree):
     example_data = [{"start": "2021-02-03", "name": "1st draft"}]
     sphinx_doctree.srcdir.joinpath("data.yaml").write_text(yaml.dump(example_data))
     sphinx_doctree.srcdir.joinpath("data.json").write_text(json.dumps(example_data))
+    sphinx_doctree.srcdir.joinpath("data.jsonl").write_text(
+        "\n".join(
+            json.dumps({"start": f"202{idx}-02-03", "name": f"draft {idx}"})
+            for idx in range(5)
+        )
+    )
     sphinx_doctree.srcdir.joinpath("template.txt").write_text(
         "{{dtrange}} - {{e.name}}"
     )
@@ -37,3 +43,184 @@ def test_posttransform_html(file_params, sphinx_doctree: CreateDoctree):
 #     )
 #     fig_html = str(html.select_one("figure.sphinx-subfigure"))
 #     file_params.assert_expected(fig_html, rstrip_lines=True)
+
+
+def test_inline_events_parsed_once(sphinx_doctree: CreateDoctree, monkeypatch):
+    """Test inline events are parsed once, rather than once per content line."""
+    from sphinx_timeline import events
+
+    calls = []
+
+    def _read_events(stream, fmt):
+        calls.append(fmt)
+        return read_events(stream, fmt)
+
+    read_events = events.read_events
+    monkeypatch.setattr(events, "read_events", _read_events)
+    sphinx_doctree.set_conf({"extensions": ["sphinx_timeline"]})
+    events = "\n".join(f"   - start: 2021-02-{idx + 1:02d}" for idx in range(20))
+    result = sphinx_doctree(f".. timeline::\n\n{events}\n   ---\n   {{{{dt}}}}\n")
+    assert not result.warnings
+    assert calls == ["yaml"]
+
+
+@pytest.mark.parametrize("chunk_size", [2, 100])
+def test_parse_chunks(sphinx_doctree: CreateDoctree, monkeypatch, chunk_size):
+    """Test parsing items in chunks gives the same result as parsing them separately."""
+    from sphinx_timeline.main import TimelineDirective
+
+    events = "\n".join(f"   - start: 2021-02-{idx + 1:02d}" for idx in range(5))
+    content = f".. timeline::\n\n{events}\n   ---\n   - {{{{dt}}}}\n\n   text\n"
+    sphinx_doctree.set_conf({"extensions": ["sphinx_timeline"]})
+    expected = sphinx_doctree(content).get_resolved_pformat()
+    sphinx_doctree.set_conf(
+        {"extensions": ["sphinx_timeline"], "timeline_parse_chunk_size": chunk_size}
+    )
+    monkeypatch.delattr(TimelineDirective, "parse_items_separately")
+    assert sphinx_doctree(content).get_resolved_pformat() == expected
+
+
+def test_html_assets(sphinx_project):
+    """Test the HTML assets are written once, and linked in timeline pages."""
+    sphinx_project.write(
+        "index.rst",
+        "Title\n=====\n\n.. timeline::\n\n   - start: 2021-02-03\n   ---\n   {{dt}}\n",
+    )
+    sphinx_project.build()
+    static_path = sphinx_project.outdir / "_sphinx_timeline_static"
+    assets = {path.name: path.stat().st_mtime_ns for path in static_path.iterdir()}
+    assert {name.rsplit(".", 1)[1] for name in assets} == {"css", "js"}
+    html = sphinx_project.read("index.html")
+    assert all(name in html for name in assets)
+
+    static_path.joinpath("default.outdated.css").write_text("")
+    sphinx_project.build()
+    assert {
+        path.name: path.stat().st_mtime_ns for path in static_path.iterdir()
+    } == assets
+
+
+def test_render_virtual(sphinx_project):
+    """Test items are written into templates, for the virtual render mode."""
+    sphinx_project.write(
+        "index.rst",
+        "Title\n=====\n\n.. timeline::\n   :render: virtual\n\n"
+        "   - start: 2021-02-03\n   - start: 2022-02-03\n   ---\n   {{dt}}\n",
+    )
+    sphinx_project.build()
+    html = sphinx_project.read("index.html")
+    assert html.count('<template class="tl-virtual"><div class="tl-item docutils"') == 2
+    assert html.count("</div>\n</template>") == 2
+    assert "virtual." in html
+
+
+def test_page_size(sphinx_project, tmp_path):
+    """Test timelines are split across HTML pages."""
+    sphinx_project.write("index.rst", "Title\n=====\n\n.. toctree::\n\n   sub/doc\n")
+    sphinx_project.write(
+        "sub/doc.rst",
+        "Doc\n===\n\n.. timeline::\n   :page-size: 2\n\n"
+        + "".join(f"   - start: 202{idx}-02-03\n" for idx in range(5))
+        + "   ---\n   {{dt}} :doc:`/index`\n",
+    )
+    sphinx_project.build()
+    pages = ["doc.html", "doc_timeline0_2.html", "doc_timeline0_3.html"]
+    outdir = sphinx_project.outdir / "sub"
+    assert sorted(path.name for path in outdir.iterdir()) == pages
+    html = [outdir.joinpath(page).read_text() for page in pages]
+    assert [page.count('class="tl-item docutils"') for page in html] == [2, 2, 1]
+    assert 'href="doc_timeline0_2.html">Next' in html[0]
+    assert 'href="doc.html">&laquo; Previous' in html[1]
+    assert 'href="../index.html"' in html[2]
+    assert "_static/datetime." in html[2]
+
+    # other builders show all items, in the document (sharing the doctrees)
+    sphinx_project.build("text", outdir=tmp_path / "text")
+    text = sphinx_project.read("sub/doc.txt", tmp_path / "text")
+    assert [f"Feb 202{idx} Title" in text for idx in range(5)] == [True] * 5
+
+
+def test_prerender(sphinx_project):
+    """Test pre-rendered timelines are written the same as other timelines."""
+    import pickle
+
+    from sphinx_timeline.prerender import TimelineHTML
+
+    sphinx_project.write(
+        "index.rst", "Title\n=====\n\n.. toctree::\n\n   a\n   b\n   c\n   d\n"
+    )
+    content = (
+        "\n\n   - start: 2021-02-03\n   - start: 2022-02-03\n   ---\n"
+        "   **{{dtrange}}** *a* ``b  c`` `d <https://example.com>`__\n\n   - e\n"
+    )
+    sphinx_project.write("a.rst", "A\n=\n\n.. timeline::" + content)
+    sphinx_project.write("b.rst", "B\n=\n\n.. timeline::\n   :prerender:" + content)
+    # cross-references cannot be pre-rendered
+    sphinx_project.write(
+        "c.rst", "C\n=\n\n.. timeline::\n   :prerender:" + content + "\n   :doc:`a`\n"
+    )
+    # nor nodes written differently by Sphinx
+    sphinx_project.write(
+        "d.rst",
+        "D\n=\n\n.. timeline::\n   :prerender:"
+        + content
+        + "\n   .. note:: f\n\n   .. code-block:: python\n\n      g = 1\n\n   :math:`h`\n",
+    )
+    sphinx_project.build()
+
+    def _load(docname):
+        with sphinx_project.doctreedir.joinpath(f"{docname}.doctree").open(
+            "rb"
+        ) as handle:
+            return pickle.load(handle)
+
+    assert len(list(_load("b").findall(TimelineHTML))) == 1
+    assert not list(_load("c").findall(TimelineHTML))
+    assert not list(_load("d").findall(TimelineHTML))
+
+    def _timeline(html):
+        return html[html.index('<div class="docutils">') : html.index("</section>")]
+
+    html_a = sphinx_project.read("a.html")
+    html_b = sphinx_project.read("b.html")
+    assert _timeline(html_a) == _timeline(html_b)
+    assert 'href="a.html"' in sphinx_project.read("c.html")
+    html_d = sphinx_project.read("d.html")
+    assert 'class="admonition note"' in html_d
+    assert 'class="highlight-python notranslate"' in html_d
+    assert 'class="math notranslate nohighlight"' in html_d
+
+
+def test_content_dependencies(sphinx_project):
+    """Test documents are only re-read when the content of their inputs changes."""
+    import os
+
+    sphinx_project.write(
+        "index.rst",
+        "Title\n=====\n\n.. timeline::\n   :events: events.yaml\n"
+        "   :template: template.txt\n",
+    )
+    events = sphinx_project.write("events.yaml", "- start: 2021-02-03\n")
+    template = sphinx_project.write("template.txt", "{{dt}}\n")
+
+    def _build() -> bool:
+        """Build, and return whether the document was re-read."""
+        with sphinx_project.app() as app:
+            read_time = app.env.all_docs.get("index")
+            app.build()
+        return app.env.all_docs["index"] != read_time
+
+    def _touch(path, content):
+        mtime_ns = path.stat().st_mtime_ns + 1_000_000_000
+        path.write_text(content)
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+    assert _build()
+    assert not _build()
+    _touch(events, "- start: 2021-02-03\n")
+    _touch(template, "{{dt}}\n")
+    assert not _build()
+    _touch(events, "- start: 2022-02-03\n")
+    assert _build()
+    _touch(template, "{{dtrange}}\n")
+    assert _build()
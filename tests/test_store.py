@@ -0,0 +1,73 @@
+from datetime import datetime, timezone
+import pickle
+
+import pytest
+
+from sphinx_timeline import dtime
+from sphinx_timeline.events import normalise_events, select_events
+from sphinx_timeline.store import EventStore
+
+
+@pytest.fixture
+def events():
+    return normalise_events(
+        [
+            {"name": "a", "start": "2021-03-28 02:30 (Europe/Zurich)"},
+            {"start": "2021-02-03", "name": "b", "duration": "1 day"},
+            {"start": "2020-02-03 10:00 (America/New_York)", "duration": "1 day"},
+            {"start": "2021-02-03", "name": "d"},
+            {"start": datetime(1900, 1, 1, 0, 0, 0, 5)},
+        ]
+    )
+
+
+def test_event_store_roundtrip(events):
+    """Test events are materialised as they were stored."""
+    store = EventStore.from_events(events)
+    assert len(store) == 5
+    for idx, event in enumerate(events):
+        materialised = store.event(idx)
+        assert materialised == event
+        assert list(materialised) == list(event)
+        assert materialised["start"].tzinfo == event["start"].tzinfo
+    assert len(store.durations) == 2  # no duration, and 1 day
+    # the wall time of a non-existent local time is kept
+    assert store.start(0).isoformat() == "2021-03-28T02:30:00+01:00"
+
+
+def test_event_store_pickle(events):
+    """Test the store is pickled without its cached sort orders."""
+    store = EventStore.from_events(events)
+    store.order()
+    restored = pickle.loads(pickle.dumps(store))
+    assert not restored._orders
+    assert [restored.event(idx) for idx in range(5)] == events
+
+
+@pytest.mark.parametrize("limit", [None, 2, 10])
+@pytest.mark.parametrize("newest_first", [True, False])
+def test_event_store_select(events, limit, newest_first):
+    """Test selection matches sorting the events, including for equal starts."""
+    store = EventStore.from_events(events)
+    expected = select_events(events, limit, newest_first)
+    assert store.select(limit, newest_first) == expected
+    store.order(newest_first)
+    assert store.select(limit, newest_first) == expected
+
+
+@pytest.mark.parametrize("newest_first", [True, False])
+def test_event_store_select_range(events, newest_first):
+    """Test selecting the events within a range of starts."""
+    store = EventStore.from_events(events)
+    start = dtime.to_datetime("2021-02-03")
+    end = datetime(2021, 3, 28, 0, 30, tzinfo=timezone.utc)
+    expected = [
+        e
+        for e in select_events(events, None, newest_first)
+        if start <= e["start"] <= end
+    ]
+    assert [e.get("name") for e in store.select(None, newest_first, start, end)] == [
+        e.get("name") for e in expected
+    ]
+    assert len(store.select(1, newest_first, start=start)) == 1
+    assert store.select(None, newest_first, end=datetime(1800, 1, 1)) == []
@@ -0,0 +1,47 @@
+import pickle
+
+import pytest
+
+from sphinx_timeline.templates import TemplateCache
+
+
+def test_from_string(tmp_path):
+    """Test inline templates are compiled once, and evicted when over size."""
+    cache = TemplateCache(tmp_path / "src", tmp_path / "cache", 2)
+    template = cache.from_string("{{ e.name }}")
+    assert template.render(e={"name": "a"}) == "a"
+    assert cache.from_string("{{ e.name }}") is template
+    cache.from_string("b")
+    cache.from_string("c")
+    assert cache.from_string("{{ e.name }}") is not template
+    with pytest.raises(ValueError, match="Template cannot be empty"):
+        cache.from_string(" \n")
+
+
+def test_from_file(tmp_path):
+    """Test templates in the source directory are loaded via the jinja loader."""
+    srcdir = tmp_path / "src"
+    srcdir.mkdir()
+    srcdir.joinpath("template.txt").write_text("{{ e.name }}\n- x")
+    srcdir.joinpath("empty.txt").write_text("")
+    cache = TemplateCache(srcdir, tmp_path / "cache", 10)
+    template = cache.from_file(srcdir / "template.txt")
+    # each line of a file is followed by a blank line, as before templates were cached
+    assert template.render(e={"name": "a"}) == "a\n\n- x"
+    assert cache.from_file(srcdir / "template.txt") is template
+    assert list(tmp_path.joinpath("cache").iterdir())
+    with pytest.raises(ValueError, match="Template cannot be empty"):
+        cache.from_file(srcdir / "empty.txt")
+    # outside of the source directory
+    tmp_path.joinpath("other.txt").write_text("{{ e.name }}")
+    assert cache.from_file(tmp_path / "other.txt").render(e={"name": "b"}) == "b"
+
+
+def test_pickle(tmp_path):
+    """Test the jinja environment is not pickled."""
+    cache = TemplateCache(tmp_path / "src", tmp_path / "cache", 10)
+    cache.from_string("a")
+    restored = pickle.loads(pickle.dumps(cache))
+    assert restored.size == 10
+    assert restored._env is None
+    assert restored.from_string("a").render() == "a"